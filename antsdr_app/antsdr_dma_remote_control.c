@@ -9,6 +9,7 @@
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
+#include <ctype.h>
 #include <unistd.h>
 #include <getopt.h>
 #include <fcntl.h>
@@ -113,7 +114,10 @@ struct antsdr_packet_header {
 #define ANTSDR_IOC_RESET_STATS      _IO(ANTSDR_IOC_MAGIC, 13)
 
 #define DEFAULT_CONTROL_PORT 12346
-#define MAX_COMMAND_LEN 256
+#define MAX_COMMAND_LEN 1024
+#define MAX_RESPONSE_LEN 2048
+#define BATCH_COMMAND_TAG "BATCH\n"
+#define REQUEST_ID_PREFIX "req"
 
 /* Fixed transfer size - must match driver */
 #define FIXED_TRANSFER_SIZE (512 * 4)   /* Fixed at 512 words = 2048 bytes */
@@ -912,9 +916,8 @@ static int change_mode(uint32_t new_mode)
     return 0;
 }
 
-static void process_control_command(const char *command, struct sockaddr_in *client_addr)
+static void build_control_response(const char *command, char *response, size_t response_size)
 {
-    char response[512];
     char action[32];
     char dest_ip[16];
     uint16_t dest_port;
@@ -924,55 +927,55 @@ static void process_control_command(const char *command, struct sockaddr_in *cli
     
     // Parse command
     if (sscanf(command, "%31s", action) != 1) {
-        snprintf(response, sizeof(response), "ERROR: Invalid command format\n");
-        goto send_response;
+        snprintf(response, response_size, "ERROR: Invalid command format\n");
+        goto log_response;
     }
     
     printf("Received command: %s\n", command);
     
     if (strcmp(action, "ping") == 0) {
-        snprintf(response, sizeof(response), "PONG: Device ready, state=%s\n", state_to_string(current_state));
+        snprintf(response, response_size, "PONG: Device ready, state=%s\n", state_to_string(current_state));
         
     } else if (strcmp(action, "setup_stream") == 0) {
         if (sscanf(command, "%31s %15s %hu %u", action, dest_ip, &dest_port, &buffer_size) == 4) {
             ret = setup_streaming_params(dest_ip, dest_port, buffer_size);
-            snprintf(response, sizeof(response), "SETUP_STREAM: %s (%s:%u, %u bytes)\n", 
+            snprintf(response, response_size, "SETUP_STREAM: %s (%s:%u, %u bytes)\n", 
                      ret == 0 ? "OK" : "FAILED", dest_ip, dest_port, buffer_size);
         } else {
-            snprintf(response, sizeof(response), "ERROR: setup_stream requires <ip> <port> <buffer_size>\n");
+            snprintf(response, response_size, "ERROR: setup_stream requires <ip> <port> <buffer_size>\n");
         }
         
     } else if (strcmp(action, "start_stream") == 0) {
         ret = start_streaming();
-        snprintf(response, sizeof(response), "START_STREAM: %s\n", ret == 0 ? "OK" : "FAILED");
+        snprintf(response, response_size, "START_STREAM: %s\n", ret == 0 ? "OK" : "FAILED");
         
     } else if (strcmp(action, "stop_stream") == 0) {
         ret = stop_streaming();
-        snprintf(response, sizeof(response), "STOP_STREAM: %s\n", ret == 0 ? "OK" : "FAILED");
+        snprintf(response, response_size, "STOP_STREAM: %s\n", ret == 0 ? "OK" : "FAILED");
         
     } else if (strcmp(action, "set_mode") == 0) {
         if (sscanf(command, "%31s %u", action, &mode) == 2) {
             ret = change_mode(mode);
-            snprintf(response, sizeof(response), "SET_MODE: %s (mode=%u)\n", 
+            snprintf(response, response_size, "SET_MODE: %s (mode=%u)\n", 
                      ret == 0 ? "OK" : "FAILED", mode);
         } else {
-            snprintf(response, sizeof(response), "ERROR: set_mode requires mode parameter (0 or 1)\n");
+            snprintf(response, response_size, "ERROR: set_mode requires mode parameter (0 or 1)\n");
         }
         
     } else if (strcmp(action, "get_mode") == 0) {
-        snprintf(response, sizeof(response), "MODE: %u (%s)\n", current_mode, 
+        snprintf(response, response_size, "MODE: %u (%s)\n", current_mode, 
                  current_mode ? "simulation" : "real_data");
         
     } else if (strcmp(action, "get_stats") == 0) {
         ret = ioctl(device_fd, ANTSDR_IOC_GET_STATS, &stats);
         if (ret == 0) {
-            snprintf(response, sizeof(response), 
+            snprintf(response, response_size, 
                      "STATS: bytes=%lu packets=%lu completions=%lu errors=%lu valid=%lu invalid=%lu extracted=%lu\n",
                      stats.bytes_transferred, stats.udp_packets_sent,
                      stats.transfers_completed, stats.errors,
                      stats.valid_frames, stats.invalid_frames, stats.extracted_frames);
         } else {
-            snprintf(response, sizeof(response), "ERROR: Failed to get statistics\n");
+            snprintf(response, response_size, "ERROR: Failed to get statistics\n");
         }
         
     } else if (strcmp(action, "get_status") == 0) {
@@ -980,7 +983,7 @@ static void process_control_command(const char *command, struct sockaddr_in *cli
         app_state_t state = current_state;
         pthread_mutex_unlock(&state_mutex);
         
-        snprintf(response, sizeof(response), 
+        snprintf(response, response_size, 
                  "STATUS: state=%s mode=%u buffer=%u dest_configured=%s\n",
                  state_to_string(state), current_mode, current_buffer_size,
                  dest_configured ? "yes" : "no");
@@ -996,7 +999,7 @@ static void process_control_command(const char *command, struct sockaddr_in *cli
         ioctl(device_fd, ANTSDR_IOC_SET_PULSE_MODE, &current_pulse_mode);
         ioctl(device_fd, ANTSDR_IOC_SET_TDD_MODE, &current_tdd_mode);
         cleanup_rf_context(); // Clean up RF configuration
-        snprintf(response, sizeof(response), "RESET: OK (back to standby mode)\n");
+        snprintf(response, response_size, "RESET: OK (back to standby mode)\n");
         
     } else if (strcmp(action, "set_rx_freq") == 0) {
         long long freq_hz;
@@ -1004,12 +1007,12 @@ static void process_control_command(const char *command, struct sockaddr_in *cli
             rf_cfg.rx_lo_hz = freq_hz;
             if (current_mode == 0 && rf_configured) {
                 ret = configure_ad9361_rx();
-                snprintf(response, sizeof(response), "SET_RX_FREQ: %s (%lld Hz)\n", ret == 0 ? "OK" : "FAILED", freq_hz);
+                snprintf(response, response_size, "SET_RX_FREQ: %s (%lld Hz)\n", ret == 0 ? "OK" : "FAILED", freq_hz);
             } else {
-                snprintf(response, sizeof(response), "SET_RX_FREQ: OK (stored, will apply in real data mode)\n");
+                snprintf(response, response_size, "SET_RX_FREQ: OK (stored, will apply in real data mode)\n");
             }
         } else {
-            snprintf(response, sizeof(response), "ERROR: set_rx_freq requires frequency in Hz\n");
+            snprintf(response, response_size, "ERROR: set_rx_freq requires frequency in Hz\n");
         }
         
     } else if (strcmp(action, "set_tx_freq") == 0) {
@@ -1018,12 +1021,12 @@ static void process_control_command(const char *command, struct sockaddr_in *cli
             rf_cfg.tx_lo_hz = freq_hz;
             if (current_mode == 0 && rf_configured && rf_cfg.tx_enabled) {
                 ret = configure_ad9361_tx();
-                snprintf(response, sizeof(response), "SET_TX_FREQ: %s (%lld Hz)\n", ret == 0 ? "OK" : "FAILED", freq_hz);
+                snprintf(response, response_size, "SET_TX_FREQ: %s (%lld Hz)\n", ret == 0 ? "OK" : "FAILED", freq_hz);
             } else {
-                snprintf(response, sizeof(response), "SET_TX_FREQ: OK (stored, will apply in real data mode)\n");
+                snprintf(response, response_size, "SET_TX_FREQ: OK (stored, will apply in real data mode)\n");
             }
         } else {
-            snprintf(response, sizeof(response), "ERROR: set_tx_freq requires frequency in Hz\n");
+            snprintf(response, response_size, "ERROR: set_tx_freq requires frequency in Hz\n");
         }
         
     } else if (strcmp(action, "set_rx_bw") == 0) {
@@ -1032,12 +1035,12 @@ static void process_control_command(const char *command, struct sockaddr_in *cli
             rf_cfg.rx_bw_hz = bw_hz;
             if (current_mode == 0 && rf_configured) {
                 ret = configure_ad9361_rx();
-                snprintf(response, sizeof(response), "SET_RX_BW: %s (%lld Hz)\n", ret == 0 ? "OK" : "FAILED", bw_hz);
+                snprintf(response, response_size, "SET_RX_BW: %s (%lld Hz)\n", ret == 0 ? "OK" : "FAILED", bw_hz);
             } else {
-                snprintf(response, sizeof(response), "SET_RX_BW: OK (stored, will apply in real data mode)\n");
+                snprintf(response, response_size, "SET_RX_BW: OK (stored, will apply in real data mode)\n");
             }
         } else {
-            snprintf(response, sizeof(response), "ERROR: set_rx_bw requires bandwidth in Hz\n");
+            snprintf(response, response_size, "ERROR: set_rx_bw requires bandwidth in Hz\n");
         }
         
     } else if (strcmp(action, "set_tx_bw") == 0) {
@@ -1046,12 +1049,12 @@ static void process_control_command(const char *command, struct sockaddr_in *cli
             rf_cfg.tx_bw_hz = bw_hz;
             if (current_mode == 0 && rf_configured && rf_cfg.tx_enabled) {
                 ret = configure_ad9361_tx();
-                snprintf(response, sizeof(response), "SET_TX_BW: %s (%lld Hz)\n", ret == 0 ? "OK" : "FAILED", bw_hz);
+                snprintf(response, response_size, "SET_TX_BW: %s (%lld Hz)\n", ret == 0 ? "OK" : "FAILED", bw_hz);
             } else {
-                snprintf(response, sizeof(response), "SET_TX_BW: OK (stored, will apply in real data mode)\n");
+                snprintf(response, response_size, "SET_TX_BW: OK (stored, will apply in real data mode)\n");
             }
         } else {
-            snprintf(response, sizeof(response), "ERROR: set_tx_bw requires bandwidth in Hz\n");
+            snprintf(response, response_size, "ERROR: set_tx_bw requires bandwidth in Hz\n");
         }
         
     } else if (strcmp(action, "set_rx_fs") == 0) {
@@ -1060,12 +1063,12 @@ static void process_control_command(const char *command, struct sockaddr_in *cli
             rf_cfg.rx_fs_hz = fs_hz;
             if (current_mode == 0 && rf_configured) {
                 ret = configure_ad9361_rx();
-                snprintf(response, sizeof(response), "SET_RX_FS: %s (%lld Hz)\n", ret == 0 ? "OK" : "FAILED", fs_hz);
+                snprintf(response, response_size, "SET_RX_FS: %s (%lld Hz)\n", ret == 0 ? "OK" : "FAILED", fs_hz);
             } else {
-                snprintf(response, sizeof(response), "SET_RX_FS: OK (stored, will apply in real data mode)\n");
+                snprintf(response, response_size, "SET_RX_FS: OK (stored, will apply in real data mode)\n");
             }
         } else {
-            snprintf(response, sizeof(response), "ERROR: set_rx_fs requires sample rate in Hz\n");
+            snprintf(response, response_size, "ERROR: set_rx_fs requires sample rate in Hz\n");
         }
         
     } else if (strcmp(action, "set_tx_fs") == 0) {
@@ -1074,12 +1077,12 @@ static void process_control_command(const char *command, struct sockaddr_in *cli
             rf_cfg.tx_fs_hz = fs_hz;
             if (current_mode == 0 && rf_configured && rf_cfg.tx_enabled) {
                 ret = configure_ad9361_tx();
-                snprintf(response, sizeof(response), "SET_TX_FS: %s (%lld Hz)\n", ret == 0 ? "OK" : "FAILED", fs_hz);
+                snprintf(response, response_size, "SET_TX_FS: %s (%lld Hz)\n", ret == 0 ? "OK" : "FAILED", fs_hz);
             } else {
-                snprintf(response, sizeof(response), "SET_TX_FS: OK (stored, will apply in real data mode)\n");
+                snprintf(response, response_size, "SET_TX_FS: OK (stored, will apply in real data mode)\n");
             }
         } else {
-            snprintf(response, sizeof(response), "ERROR: set_tx_fs requires sample rate in Hz\n");
+            snprintf(response, response_size, "ERROR: set_tx_fs requires sample rate in Hz\n");
         }
         
     } else if (strcmp(action, "set_tx_enable") == 0) {
@@ -1088,13 +1091,13 @@ static void process_control_command(const char *command, struct sockaddr_in *cli
             rf_cfg.tx_enabled = tx_enable ? 1 : 0;
             if (current_mode == 0 && rf_configured) {
                 ret = configure_ad9361_tx();
-                snprintf(response, sizeof(response), "SET_TX_ENABLE: %s (TX %s)\n", 
+                snprintf(response, response_size, "SET_TX_ENABLE: %s (TX %s)\n", 
                          ret == 0 ? "OK" : "FAILED", rf_cfg.tx_enabled ? "enabled" : "disabled");
             } else {
-                snprintf(response, sizeof(response), "SET_TX_ENABLE: OK (stored, will apply in real data mode)\n");
+                snprintf(response, response_size, "SET_TX_ENABLE: OK (stored, will apply in real data mode)\n");
             }
         } else {
-            snprintf(response, sizeof(response), "ERROR: set_tx_enable requires 0 or 1\n");
+            snprintf(response, response_size, "ERROR: set_tx_enable requires 0 or 1\n");
         }
         
     } else if (strcmp(action, "set_rx_gain_mode") == 0) {
@@ -1105,16 +1108,16 @@ static void process_control_command(const char *command, struct sockaddr_in *cli
                 rf_cfg.rx_gain_mode = strdup(gain_mode);
                 if (current_mode == 0 && rf_configured) {
                     ret = configure_rf_parameters(&rf_cfg);
-                    snprintf(response, sizeof(response), "SET_RX_GAIN_MODE: %s (%s)\n", 
+                    snprintf(response, response_size, "SET_RX_GAIN_MODE: %s (%s)\n", 
                              ret == 0 ? "OK" : "FAILED", gain_mode);
                 } else {
-                    snprintf(response, sizeof(response), "SET_RX_GAIN_MODE: OK (stored, will apply in real data mode)\n");
+                    snprintf(response, response_size, "SET_RX_GAIN_MODE: OK (stored, will apply in real data mode)\n");
                 }
             } else {
-                snprintf(response, sizeof(response), "ERROR: Invalid gain mode. Use manual, slow_attack, or fast_attack\n");
+                snprintf(response, response_size, "ERROR: Invalid gain mode. Use manual, slow_attack, or fast_attack\n");
             }
         } else {
-            snprintf(response, sizeof(response), "ERROR: set_rx_gain_mode requires gain mode parameter\n");
+            snprintf(response, response_size, "ERROR: set_rx_gain_mode requires gain mode parameter\n");
         }
         
     } else if (strcmp(action, "set_rx_gain") == 0) {
@@ -1123,13 +1126,13 @@ static void process_control_command(const char *command, struct sockaddr_in *cli
             rf_cfg.rx_gain_db = gain_db;
             if (current_mode == 0 && rf_configured && strcmp(rf_cfg.rx_gain_mode, "manual") == 0) {
                 ret = configure_rf_parameters(&rf_cfg);
-                snprintf(response, sizeof(response), "SET_RX_GAIN: %s (%.2f dB)\n", 
+                snprintf(response, response_size, "SET_RX_GAIN: %s (%.2f dB)\n", 
                          ret == 0 ? "OK" : "FAILED", gain_db);
             } else {
-                snprintf(response, sizeof(response), "SET_RX_GAIN: OK (stored, requires manual gain mode to apply)\n");
+                snprintf(response, response_size, "SET_RX_GAIN: OK (stored, requires manual gain mode to apply)\n");
             }
         } else {
-            snprintf(response, sizeof(response), "ERROR: set_rx_gain requires gain in dB\n");
+            snprintf(response, response_size, "ERROR: set_rx_gain requires gain in dB\n");
         }
         
     } else if (strcmp(action, "set_tx_gain") == 0) {
@@ -1138,13 +1141,13 @@ static void process_control_command(const char *command, struct sockaddr_in *cli
             rf_cfg.tx_gain_db = gain_db;
             if (current_mode == 0 && rf_configured && rf_cfg.tx_enabled) {
                 ret = configure_rf_parameters(&rf_cfg);
-                snprintf(response, sizeof(response), "SET_TX_GAIN: %s (%.2f dB)\n", 
+                snprintf(response, response_size, "SET_TX_GAIN: %s (%.2f dB)\n", 
                          ret == 0 ? "OK" : "FAILED", gain_db);
             } else {
-                snprintf(response, sizeof(response), "SET_TX_GAIN: OK (stored, will apply when TX enabled)\n");
+                snprintf(response, response_size, "SET_TX_GAIN: OK (stored, will apply when TX enabled)\n");
             }
         } else {
-            snprintf(response, sizeof(response), "ERROR: set_tx_gain requires gain in dB\n");
+            snprintf(response, response_size, "ERROR: set_tx_gain requires gain in dB\n");
         }
         
     } else if (strcmp(action, "set_rx_port") == 0) {
@@ -1153,13 +1156,13 @@ static void process_control_command(const char *command, struct sockaddr_in *cli
             rf_cfg.rx_rfport = strdup(rx_port);
             if (current_mode == 0 && rf_configured) {
                 ret = configure_rf_parameters(&rf_cfg);
-                snprintf(response, sizeof(response), "SET_RX_PORT: %s (%s)\n", 
+                snprintf(response, response_size, "SET_RX_PORT: %s (%s)\n", 
                          ret == 0 ? "OK" : "FAILED", rx_port);
             } else {
-                snprintf(response, sizeof(response), "SET_RX_PORT: OK (stored, will apply in real data mode)\n");
+                snprintf(response, response_size, "SET_RX_PORT: OK (stored, will apply in real data mode)\n");
             }
         } else {
-            snprintf(response, sizeof(response), "ERROR: set_rx_port requires port name (A_BALANCED, B_BALANCED, etc.)\n");
+            snprintf(response, response_size, "ERROR: set_rx_port requires port name (A_BALANCED, B_BALANCED, etc.)\n");
         }
         
     } else if (strcmp(action, "set_tx_port") == 0) {
@@ -1168,13 +1171,13 @@ static void process_control_command(const char *command, struct sockaddr_in *cli
             rf_cfg.tx_rfport = strdup(tx_port);
             if (current_mode == 0 && rf_configured && rf_cfg.tx_enabled) {
                 ret = configure_rf_parameters(&rf_cfg);
-                snprintf(response, sizeof(response), "SET_TX_PORT: %s (%s)\n", 
+                snprintf(response, response_size, "SET_TX_PORT: %s (%s)\n", 
                          ret == 0 ? "OK" : "FAILED", tx_port);
             } else {
-                snprintf(response, sizeof(response), "SET_TX_PORT: OK (stored, will apply when TX enabled)\n");
+                snprintf(response, response_size, "SET_TX_PORT: OK (stored, will apply when TX enabled)\n");
             }
         } else {
-            snprintf(response, sizeof(response), "ERROR: set_tx_port requires port name (A, B)\n");
+            snprintf(response, response_size, "ERROR: set_tx_port requires port name (A, B)\n");
         }
         
     } else if (strcmp(action, "set_ensm_mode") == 0) {
@@ -1185,25 +1188,25 @@ static void process_control_command(const char *command, struct sockaddr_in *cli
                 rf_cfg.ensm_mode = strdup(ensm_mode);
                 if (current_mode == 0 && rf_configured) {
                     ret = configure_rf_parameters(&rf_cfg);
-                    snprintf(response, sizeof(response), "SET_ENSM_MODE: %s (%s)\n", 
+                    snprintf(response, response_size, "SET_ENSM_MODE: %s (%s)\n", 
                              ret == 0 ? "OK" : "FAILED", ensm_mode);
                 } else {
-                    snprintf(response, sizeof(response), "SET_ENSM_MODE: OK (stored, will apply in real data mode)\n");
+                    snprintf(response, response_size, "SET_ENSM_MODE: OK (stored, will apply in real data mode)\n");
                 }
             } else {
-                snprintf(response, sizeof(response), "ERROR: Invalid ENSM mode. Use sleep, alert, fdd, or tdd\n");
+                snprintf(response, response_size, "ERROR: Invalid ENSM mode. Use sleep, alert, fdd, or tdd\n");
             }
         } else {
-            snprintf(response, sizeof(response), "ERROR: set_ensm_mode requires mode parameter\n");
+            snprintf(response, response_size, "ERROR: set_ensm_mode requires mode parameter\n");
         }
         
     } else if (strcmp(action, "verify_rf_params") == 0) {
         if (current_mode == 0 && rf_configured) {
             ret = verify_rf_parameters(&rf_cfg);
-            snprintf(response, sizeof(response), "VERIFY_RF_PARAMS: %s (check console output for details)\n", 
+            snprintf(response, response_size, "VERIFY_RF_PARAMS: %s (check console output for details)\n", 
                      ret == 0 ? "OK" : "FAILED");
         } else {
-            snprintf(response, sizeof(response), "VERIFY_RF_PARAMS: Not available (real data mode not active)\n");
+            snprintf(response, response_size, "VERIFY_RF_PARAMS: Not available (real data mode not active)\n");
         }
         
     } else if (strcmp(action, "configure_rf") == 0) {
@@ -1213,16 +1216,16 @@ static void process_control_command(const char *command, struct sockaddr_in *cli
                 rf_configured = 1;
                 // Also verify the parameters after configuration
                 verify_rf_parameters(&rf_cfg);
-                snprintf(response, sizeof(response), "CONFIGURE_RF: OK (all parameters applied and verified)\n");
+                snprintf(response, response_size, "CONFIGURE_RF: OK (all parameters applied and verified)\n");
             } else {
-                snprintf(response, sizeof(response), "CONFIGURE_RF: FAILED\n");
+                snprintf(response, response_size, "CONFIGURE_RF: FAILED\n");
             }
         } else {
-            snprintf(response, sizeof(response), "CONFIGURE_RF: Not available (only in real data mode)\n");
+            snprintf(response, response_size, "CONFIGURE_RF: Not available (only in real data mode)\n");
         }
         
     } else if (strcmp(action, "get_rf_config") == 0) {
-        snprintf(response, sizeof(response), 
+        snprintf(response, response_size, 
                  "RF_CONFIG: RX_FREQ=%lld RX_BW=%lld RX_FS=%lld RX_GAIN_MODE=%s RX_GAIN=%.2f RX_PORT=%s "
                  "TX_FREQ=%lld TX_BW=%lld TX_FS=%lld TX_GAIN=%.2f TX_PORT=%s TX_EN=%d ENSM=%s\n",
                  rf_cfg.rx_lo_hz, rf_cfg.rx_bw_hz, rf_cfg.rx_fs_hz, rf_cfg.rx_gain_mode, rf_cfg.rx_gain_db, rf_cfg.rx_rfport,
@@ -1235,22 +1238,22 @@ static void process_control_command(const char *command, struct sockaddr_in *cli
             ret = ioctl(device_fd, ANTSDR_IOC_SET_PULSE_MODE, &pulse_mode);
             if (ret == 0) {
                 current_pulse_mode = pulse_mode;
-                snprintf(response, sizeof(response), "SET_PULSE_MODE: OK (pulse_mode=%s)\n", 
+                snprintf(response, response_size, "SET_PULSE_MODE: OK (pulse_mode=%s)\n", 
                          pulse_mode ? "enabled" : "disabled");
             } else {
-                snprintf(response, sizeof(response), "SET_PULSE_MODE: FAILED\n");
+                snprintf(response, response_size, "SET_PULSE_MODE: FAILED\n");
             }
         } else {
-            snprintf(response, sizeof(response), "ERROR: set_pulse_mode requires mode parameter (0 or 1)\n");
+            snprintf(response, response_size, "ERROR: set_pulse_mode requires mode parameter (0 or 1)\n");
         }
         
     } else if (strcmp(action, "get_pulse_mode") == 0) {
         ret = ioctl(device_fd, ANTSDR_IOC_GET_PULSE_MODE, &current_pulse_mode);
         if (ret == 0) {
-            snprintf(response, sizeof(response), "PULSE_MODE: %u (%s)\n", current_pulse_mode,
+            snprintf(response, response_size, "PULSE_MODE: %u (%s)\n", current_pulse_mode,
                      current_pulse_mode ? "enabled" : "disabled");
         } else {
-            snprintf(response, sizeof(response), "ERROR: Failed to get pulse mode\n");
+            snprintf(response, response_size, "ERROR: Failed to get pulse mode\n");
         }
         
     } else if (strcmp(action, "set_tdd_mode") == 0) {
@@ -1259,34 +1262,71 @@ static void process_control_command(const char *command, struct sockaddr_in *cli
             ret = ioctl(device_fd, ANTSDR_IOC_SET_TDD_MODE, &tdd_mode);
             if (ret == 0) {
                 current_tdd_mode = tdd_mode;
-                snprintf(response, sizeof(response), "SET_TDD_MODE: OK (tdd_mode=%s)\n", 
+                snprintf(response, response_size, "SET_TDD_MODE: OK (tdd_mode=%s)\n", 
                          tdd_mode ? "enabled" : "disabled");
             } else {
-                snprintf(response, sizeof(response), "SET_TDD_MODE: FAILED\n");
+                snprintf(response, response_size, "SET_TDD_MODE: FAILED\n");
             }
         } else {
-            snprintf(response, sizeof(response), "ERROR: set_tdd_mode requires mode parameter (0 or 1)\n");
+            snprintf(response, response_size, "ERROR: set_tdd_mode requires mode parameter (0 or 1)\n");
         }
         
     } else if (strcmp(action, "get_tdd_mode") == 0) {
         ret = ioctl(device_fd, ANTSDR_IOC_GET_TDD_MODE, &current_tdd_mode);
         if (ret == 0) {
-            snprintf(response, sizeof(response), "TDD_MODE: %u (%s)\n", current_tdd_mode,
+            snprintf(response, response_size, "TDD_MODE: %u (%s)\n", current_tdd_mode,
                      current_tdd_mode ? "enabled" : "disabled");
         } else {
-            snprintf(response, sizeof(response), "ERROR: Failed to get TDD mode\n");
+            snprintf(response, response_size, "ERROR: Failed to get TDD mode\n");
         }
         
     } else {
-        snprintf(response, sizeof(response), "ERROR: Unknown command '%s'\n", action);
+        snprintf(response, response_size, "ERROR: Unknown command '%s'\n", action);
     }
 
-send_response:
+log_response:
     printf("Response: %s", response);
+}
+
+static void process_control_command(char *command, struct sockaddr_in *client_addr)
+{
+    char response[MAX_RESPONSE_LEN];
+    size_t used = 0;
+    
+    // Optional "req<id> " prefix, echoed in front of the response so a client
+    // with several requests in flight can match replies to requests
+    if (strncmp(command, REQUEST_ID_PREFIX, strlen(REQUEST_ID_PREFIX)) == 0) {
+        char *id_end = command + strlen(REQUEST_ID_PREFIX);
+        while (isdigit((unsigned char)*id_end)) {
+            id_end++;
+        }
+        if (id_end > command + strlen(REQUEST_ID_PREFIX) && *id_end == ' ' &&
+            (size_t)(id_end + 1 - command) < sizeof(response)) {
+            used = id_end + 1 - command;
+            memcpy(response, command, used);
+            command = id_end + 1;
+        }
+    }
+    
+    if (strncmp(command, BATCH_COMMAND_TAG, strlen(BATCH_COMMAND_TAG)) == 0) {
+        // Batched request: one command per line, responses concatenated in order
+        char *saveptr = NULL;
+        char *line = strtok_r(command + strlen(BATCH_COMMAND_TAG), "\n", &saveptr);
+        
+        response[used] = '\0';
+        while (line != NULL && used < sizeof(response) - 1) {
+            build_control_response(line, response + used, sizeof(response) - used);
+            used += strlen(response + used);
+            line = strtok_r(NULL, "\n", &saveptr);
+        }
+    } else {
+        build_control_response(command, response + used, sizeof(response) - used);
+        used += strlen(response + used);
+    }
     
     // Send response back to client
     if (control_sock >= 0) {
-        sendto(control_sock, response, strlen(response), 0,
+        sendto(control_sock, response, used, 0,
                (struct sockaddr *)client_addr, sizeof(*client_addr));
     }
 }
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+ANTSDR Async Remote Control Client
+==================================
+
+asyncio version of the control client for driving several boards at once.
+Every command is tagged with a request id ("req42 get_stats") which the
+board echoes in front of its reply, so any number of requests can be in
+flight on one socket and the replies matched back to them. Polling N
+boards then takes as long as the slowest round trip rather than the sum.
+
+uvloop is used for the event loop when it is installed.
+
+Usage:
+    python3 antsdr_async.py --boards <ip>,<ip>,... [command]
+
+Examples:
+    python3 antsdr_async.py --boards 192.168.1.12,192.168.1.13 stats
+    python3 antsdr_async.py --boards 192.168.1.12,192.168.1.13 status
+"""
+
+import asyncio
+import argparse
+import itertools
+
+from antsdr_remote_client import ANTSDRController, BATCH_TAG, split_batch_reply
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# Reply of daemons built before request ids were added ("req1 info" is
+# taken as an unknown command "req1")
+TAG_UNSUPPORTED = b"ERROR: Unknown command 'req"
+
+class _ControlProtocol(asyncio.DatagramProtocol):
+    """Resolves the pending future whose request id prefixes a reply.
+
+    Once the daemon turns out not to understand request ids, `tagged` is
+    cleared and replies resolve the single untagged request, keyed None.
+    """
+    def __init__(self):
+        self.pending = {}
+        self.tagged = True
+
+    def datagram_received(self, data, addr):
+        if self.tagged and data.startswith(TAG_UNSUPPORTED):
+            # Hand the rejection to everything in flight so it is resent
+            self.tagged = False
+            futures = list(self.pending.values())
+            self.pending.clear()
+        elif self.tagged:
+            tag, _, data = data.partition(b' ')
+            futures = [self.pending.pop(tag, None)]
+        elif data.startswith(TAG_UNSUPPORTED):
+            # Late rejections of tagged requests that were already resent
+            return
+        else:
+            futures = [self.pending.pop(None, None)]
+        for future in futures:
+            if future is not None and not future.done():
+                future.set_result(data)
+
+    def error_received(self, exc):
+        # ICMP errors are not tied to a request; fail everything in flight
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(exc)
+        self.pending.clear()
+
+    def connection_lost(self, exc):
+        self.error_received(exc or ConnectionError("control socket closed"))
+
+class AsyncANTSDRController:
+    # Same encoded commands as the synchronous client
+    _CMD_INFO = ANTSDRController._CMD_INFO
+    _CMD_STATUS = ANTSDRController._CMD_STATUS
+    _CMD_STATS = ANTSDRController._CMD_STATS
+    _CMD_START = ANTSDRController._CMD_START
+    _CMD_STOP = ANTSDRController._CMD_STOP
+    _CMD_RESET = ANTSDRController._CMD_RESET
+
+    def __init__(self, board_ip, control_port=12346, timeout=5.0):
+        self.board_ip = board_ip
+        self.control_port = control_port
+        self.timeout = timeout
+        self.transport = None
+        self.protocol = None
+        self._ids = itertools.count(1)
+        # Serialises requests to daemons that cannot tag their replies
+        self._untagged = asyncio.Lock()
+
+    async def connect(self):
+        """Open the control socket, connected to the board"""
+        loop = asyncio.get_running_loop()
+        self.transport, self.protocol = await loop.create_datagram_endpoint(
+            _ControlProtocol, remote_addr=(self.board_ip, self.control_port))
+        return self
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+
+    async def _exchange(self, key, datagram):
+        """Send `datagram` and wait for the reply resolving pending[key]"""
+        future = asyncio.get_running_loop().create_future()
+        self.protocol.pending[key] = future
+        try:
+            self.transport.sendto(datagram)
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            self.protocol.pending.pop(key, None)
+
+    async def _transact(self, payload):
+        """Send one tagged datagram and return the decoded reply body"""
+        if self.protocol.tagged:
+            tag = b"req%d" % next(self._ids)
+            body = await self._exchange(tag, tag + b" " + payload)
+            if self.protocol.tagged or not body.startswith(TAG_UNSUPPORTED):
+                return body.decode()
+
+        # The daemon predates request ids: plain commands, one in flight
+        async with self._untagged:
+            return (await self._exchange(None, payload)).decode()
+
+    async def send_command_b(self, cmd_bytes):
+        """Send an already encoded command to ANTSDR and return response"""
+        try:
+            return (await self._transact(cmd_bytes)).strip()
+
+        except asyncio.TimeoutError:
+            return f"ERROR: Timeout - no response from {self.board_ip}:{self.control_port}"
+        except Exception as e:
+            return f"ERROR: {str(e)}"
+
+    async def send_command(self, command):
+        """Send command to ANTSDR and return response"""
+        return await self.send_command_b(command.encode())
+
+    async def send_commands(self, commands):
+        """Send several commands in one datagram and return a list of responses"""
+        try:
+            commands = [c.encode() if isinstance(c, str) else c for c in commands]
+            responses = split_batch_reply(
+                await self._transact(BATCH_TAG + b"\n".join(commands)), len(commands))
+
+        except asyncio.TimeoutError:
+            error = f"ERROR: Timeout - no response from {self.board_ip}:{self.control_port}"
+            return [error] * len(commands)
+        except Exception as e:
+            return [f"ERROR: {str(e)}"] * len(commands)
+
+        # Older daemons reject the batch as a whole; send one at a time
+        if responses is None:
+            return [await self.send_command_b(c) for c in commands]
+        return responses
+
+    async def get_info(self):
+        """Get device information"""
+        return await self.send_command_b(self._CMD_INFO)
+
+    async def get_status(self):
+        """Get current status"""
+        return await self.send_command_b(self._CMD_STATUS)
+
+    async def get_stats(self):
+        """Get transfer statistics"""
+        return await self.send_command_b(self._CMD_STATS)
+
+    async def start_streaming(self):
+        """Start DMA streaming"""
+        return await self.send_command_b(self._CMD_START)
+
+    async def stop_streaming(self):
+        """Stop DMA streaming"""
+        return await self.send_command_b(self._CMD_STOP)
+
+    async def reset(self):
+        """Reset and stop streaming"""
+        return await self.send_command_b(self._CMD_RESET)
+
+# Commands that can be fanned out to every board
+COMMANDS = {
+    'info': AsyncANTSDRController.get_info,
+    'status': AsyncANTSDRController.get_status,
+    'stats': AsyncANTSDRController.get_stats,
+    'start': AsyncANTSDRController.start_streaming,
+    'stop': AsyncANTSDRController.stop_streaming,
+    'reset': AsyncANTSDRController.reset,
+}
+
+async def run_on_boards(boards, command, port=12346, timeout=5.0):
+    """Run `command` on every board concurrently; returns [(ip, response)]"""
+    controllers = [AsyncANTSDRController(ip, port, timeout) for ip in boards]
+
+    async def run_one(controller):
+        try:
+            await controller.connect()
+        except OSError as e:
+            return f"ERROR: Cannot reach {controller.board_ip}:{port} - {e}"
+        return await COMMANDS[command](controller)
+
+    try:
+        responses = await asyncio.gather(*(run_one(c) for c in controllers))
+    finally:
+        for controller in controllers:
+            controller.close()
+    return list(zip(boards, responses))
+
+def main():
+    parser = argparse.ArgumentParser(description='ANTSDR Async Remote Control Client')
+    parser.add_argument('--boards', required=True,
+                      help='Comma-separated IP addresses of ANTSDR boards')
+    parser.add_argument('command', nargs='?', default='stats', choices=sorted(COMMANDS),
+                      help='Command to run on every board (default: stats)')
+    parser.add_argument('--port', type=int, default=12346,
+                      help='Control port (default: 12346)')
+    parser.add_argument('--timeout', type=float, default=5.0,
+                      help='Response timeout in seconds (default: 5.0)')
+
+    args = parser.parse_args()
+    boards = [ip.strip() for ip in args.boards.split(',') if ip.strip()]
+
+    run = uvloop.run if uvloop is not None else asyncio.run
+    results = run(run_on_boards(boards, args.command, args.port, args.timeout))
+    for board_ip, response in results:
+        print(f"[{board_ip}] {response}")
+
+if __name__ == "__main__":
+    main()
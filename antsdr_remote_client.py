@@ -22,94 +22,286 @@ import sys
 import time
 import argparse
 
+# Prefix telling the board that the datagram carries one command per line
+BATCH_TAG = b"BATCH\n"
+# Reply of daemons built before batching was added
+BATCH_UNSUPPORTED = "ERROR: Unknown command 'BATCH'"
+RESPONSE_BUFFER_SIZE = 2048
+CONTROL_SOCKET_BUFFER = 256 * 1024
+
+# Linux path-MTU options, not exported by the socket module
+IP_MTU_DISCOVER = getattr(socket, 'IP_MTU_DISCOVER', 10)
+IP_PMTUDISC_DO = getattr(socket, 'IP_PMTUDISC_DO', 2)
+
+# With MSG_TRUNC, Linux reports the full datagram length even when it did
+# not fit the receive buffer
+RECV_FLAGS = socket.MSG_TRUNC if sys.platform.startswith('linux') else 0
+
+def split_batch_reply(reply, count):
+    """Split a BATCH reply into `count` responses.
+    
+    Returns None when the daemon predates batching, in which case the
+    commands have to be sent one at a time.
+    """
+    responses = reply.splitlines()
+    if responses and responses[0].startswith(BATCH_UNSUPPORTED):
+        return None
+    
+    # The board answers one line per command; pad if the reply was cut short
+    missing = count - len(responses)
+    if missing > 0:
+        responses += ["ERROR: No response"] * missing
+    return responses[:count]
+
 class ANTSDRController:
+    # Fixed commands, encoded once
+    _CMD_INFO = b"info"
+    _CMD_STATUS = b"get_status"
+    _CMD_MODE = b"get_mode"
+    _CMD_DAC_BYPASS = b"get_dac_bypass"
+    _CMD_STATS = b"get_stats"
+    _CMD_START = b"start"
+    _CMD_STOP = b"stop"
+    _CMD_RESET = b"reset"
+    
     def __init__(self, board_ip, control_port=12346, timeout=5.0):
         self.board_ip = board_ip
         self.control_port = control_port
         self.timeout = timeout
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, CONTROL_SOCKET_BUFFER)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, CONTROL_SOCKET_BUFFER)
+        if sys.platform.startswith('linux'):
+            # Set DF so oversized batches fail loudly instead of fragmenting
+            self.sock.setsockopt(socket.IPPROTO_IP, IP_MTU_DISCOVER, IP_PMTUDISC_DO)
         self.sock.settimeout(timeout)
         
-    def send_command(self, command):
-        """Send command to ANTSDR and return response"""
+        # Fix the peer once so send()/recv() skip the per-call address handling
+        self.sock.connect((board_ip, control_port))
+        self._rxbuf = bytearray(RESPONSE_BUFFER_SIZE)
+        self._rxmv = memoryview(self._rxbuf)
+        
+    def _transact(self, payload):
+        """Send one datagram and return the decoded reply datagram"""
+        self.sock.send(payload)
+        
+        # Receive into the persistent buffer instead of allocating per call
+        nbytes = self.sock.recv_into(self._rxbuf, 0, RECV_FLAGS)
+        if nbytes > len(self._rxbuf):
+            raise ValueError(f"Response truncated ({nbytes} bytes, "
+                             f"buffer holds {len(self._rxbuf)})")
+        return str(self._rxmv[:nbytes], 'utf-8')
+        
+    def send_command_b(self, cmd_bytes):
+        """Send an already encoded command to ANTSDR and return response"""
         try:
-            # Send command
-            self.sock.sendto(command.encode(), (self.board_ip, self.control_port))
-            
-            # Receive response
-            response, addr = self.sock.recvfrom(1024)
-            return response.decode().strip()
+            return self._transact(cmd_bytes).strip()
             
         except socket.timeout:
             return f"ERROR: Timeout - no response from {self.board_ip}:{self.control_port}"
         except Exception as e:
             return f"ERROR: {str(e)}"
     
+    def send_command(self, command):
+        """Send command to ANTSDR and return response"""
+        return self.send_command_b(command.encode())
+    
+    def send_commands(self, commands):
+        """Send several commands (bytes or str) in one datagram and return a
+        list of responses"""
+        commands = [c.encode() if isinstance(c, str) else c for c in commands]
+        try:
+            responses = split_batch_reply(
+                self._transact(BATCH_TAG + b"\n".join(commands)), len(commands))
+            
+        except socket.timeout:
+            error = f"ERROR: Timeout - no response from {self.board_ip}:{self.control_port}"
+            return [error] * len(commands)
+        except Exception as e:
+            return [f"ERROR: {str(e)}"] * len(commands)
+        
+        # Older daemons reject the batch as a whole; send one at a time
+        if responses is None:
+            return [self.send_command_b(c) for c in commands]
+        return responses
+    
     def get_info(self):
         """Get device information"""
-        return self.send_command("info")
+        return self.send_command_b(self._CMD_INFO)
     
     def get_status(self):
         """Get current status"""
-        return self.send_command("get_status")
+        return self.send_command_b(self._CMD_STATUS)
     
     def set_mode(self, mode):
         """Set operation mode (0 or 1)"""
         if mode not in [0, 1]:
             return "ERROR: Mode must be 0 or 1"
-        return self.send_command(f"set_mode {mode}")
+        return self.send_command_b(b"set_mode %d" % mode)
     
     def get_mode(self):
         """Get current operation mode"""
-        return self.send_command("get_mode")
+        return self.send_command_b(self._CMD_MODE)
     
     def set_dac_bypass(self, enable):
         """Enable/disable PL DAC bypass mode"""
         bypass_val = 1 if enable else 0
-        return self.send_command(f"set_dac_bypass {bypass_val}")
+        return self.send_command_b(b"set_dac_bypass %d" % bypass_val)
     
     def get_dac_bypass(self):
         """Get current DAC bypass status"""
-        return self.send_command("get_dac_bypass")
+        return self.send_command_b(self._CMD_DAC_BYPASS)
     
     def set_buffer_size(self, size):
         """Set buffer size"""
         if size < 512 or size > 65536 or size % 4 != 0:
             return "ERROR: Buffer size must be 512-65536 bytes, 4-byte aligned"
-        return self.send_command(f"set_buffer {size}")
+        return self.send_command_b(b"set_buffer %d" % size)
     
     def set_destination(self, dest_ip, dest_port):
         """Set UDP destination for data stream"""
-        return self.send_command(f"set_dest {dest_ip} {dest_port}")
+        return self.send_command_b(b"set_dest %s %d" % (dest_ip.encode(), dest_port))
     
     def start_streaming(self):
         """Start DMA streaming"""
-        return self.send_command("start")
+        return self.send_command_b(self._CMD_START)
     
     def stop_streaming(self):
         """Stop DMA streaming"""
-        return self.send_command("stop")
+        return self.send_command_b(self._CMD_STOP)
     
     def get_stats(self):
         """Get transfer statistics"""
-        return self.send_command("get_stats")
+        return self.send_command_b(self._CMD_STATS)
     
     def reset(self):
         """Reset and stop streaming"""
-        return self.send_command("reset")
+        return self.send_command_b(self._CMD_RESET)
     
     def monitor_stats(self, duration=10, interval=2):
         """Monitor statistics for specified duration"""
         print(f"Monitoring statistics for {duration} seconds...")
-        start_time = time.time()
+        next_t = time.monotonic()
+        end = next_t + duration
         
-        while time.time() - start_time < duration:
-            stats = self.get_stats()
-            status = self.get_status()
+        while time.monotonic() < end:
+            status, stats = self.send_commands([self._CMD_STATUS, self._CMD_STATS])
             print(f"[{time.strftime('%H:%M:%S')}] {status}")
             print(f"[{time.strftime('%H:%M:%S')}] {stats}")
             print("-" * 50)
-            time.sleep(interval)
+            
+            # Sleep to an absolute deadline so round-trip time does not
+            # stretch the sampling interval
+            next_t += interval
+            time.sleep(max(0, next_t - time.monotonic()))
+
+def _handle_set_mode(controller, args):
+    if not args:
+        return "ERROR: set_mode requires mode argument (0 or 1)"
+    try:
+        mode = int(args[0])
+    except ValueError:
+        return "ERROR: Mode must be a number (0 or 1)"
+    return controller.set_mode(mode)
+
+def _handle_set_dac_bypass(controller, args):
+    if not args:
+        return "ERROR: set_dac_bypass requires enable argument (0 or 1)"
+    try:
+        enable = int(args[0])
+    except ValueError:
+        return "ERROR: DAC bypass enable must be a number (0 or 1)"
+    if enable not in [0, 1]:
+        return "ERROR: DAC bypass enable must be 0 or 1"
+    return controller.set_dac_bypass(enable == 1)
+
+def _handle_set_buffer(controller, args):
+    if not args:
+        return "ERROR: set_buffer requires size argument"
+    try:
+        size = int(args[0])
+    except ValueError:
+        return "ERROR: Buffer size must be a number"
+    return controller.set_buffer_size(size)
+
+def _handle_set_dest(controller, args):
+    if len(args) < 2:
+        return "ERROR: set_dest requires IP and port arguments"
+    try:
+        dest_port = int(args[1])
+    except ValueError:
+        return "ERROR: Port must be a number"
+    return controller.set_destination(args[0], dest_port)
+
+def _handle_monitor(controller, args):
+    duration = 10
+    if args:
+        try:
+            duration = int(args[0])
+        except ValueError:
+            pass
+    controller.monitor_stats(duration)
+
+def _handle_test_sequence(controller, args):
+    print("Running test sequence...")
+    print("1. Getting device info...")
+    print(f"   {controller.get_info()}")
+    
+    print("2. Setting mode to 1...")
+    print(f"   {controller.set_mode(1)}")
+    
+    print("3. Setting buffer size to 4096...")
+    print(f"   {controller.set_buffer_size(4096)}")
+    
+    print("4. Setting destination to 192.168.1.100:12345...")
+    print(f"   {controller.set_destination('192.168.1.100', 12345)}")
+    
+    print("5. Starting streaming...")
+    print(f"   {controller.start_streaming()}")
+    
+    print("6. Monitoring for 10 seconds...")
+    controller.monitor_stats(10, 2)
+    
+    print("7. Stopping streaming...")
+    print(f"   {controller.stop_streaming()}")
+    
+    print("8. Final statistics...")
+    print(f"   {controller.get_stats()}")
+
+def _unknown(command):
+    print("\nAvailable commands:")
+    print("  info                    - Get device information")
+    print("  status                  - Get current status")
+    print("  set_mode <0|1>          - Set operation mode")
+    print("  get_mode                - Get current mode")
+    print("  set_buffer <size>       - Set buffer size")
+    print("  set_dest <ip> <port>    - Set destination")
+    print("  start                   - Start streaming")
+    print("  stop                    - Stop streaming")
+    print("  stats                   - Get statistics")
+    print("  reset                   - Reset and stop")
+    print("  monitor [duration]      - Monitor stats")
+    print("  test_sequence           - Run full test")
+    return f"ERROR: Unknown command '{command}'"
+
+# Command name -> handler(controller, args); handlers returning None print
+# their own output
+DISPATCH = {
+    'info': lambda c, a: c.get_info(),
+    'status': lambda c, a: c.get_status(),
+    'set_mode': _handle_set_mode,
+    'get_mode': lambda c, a: c.get_mode(),
+    'set_dac_bypass': _handle_set_dac_bypass,
+    'get_dac_bypass': lambda c, a: c.get_dac_bypass(),
+    'set_buffer': _handle_set_buffer,
+    'set_dest': _handle_set_dest,
+    'start': lambda c, a: c.start_streaming(),
+    'stop': lambda c, a: c.stop_streaming(),
+    'stats': lambda c, a: c.get_stats(),
+    'reset': lambda c, a: c.reset(),
+    'monitor': _handle_monitor,
+    'test_sequence': _handle_test_sequence,
+}
 
 def main():
     parser = argparse.ArgumentParser(description='ANTSDR Remote Control Client')
@@ -125,133 +317,19 @@ def main():
     args = parser.parse_args()
     
     # Create controller
-    controller = ANTSDRController(args.board_ip, args.port, args.timeout)
+    try:
+        controller = ANTSDRController(args.board_ip, args.port, args.timeout)
+    except OSError as e:
+        print(f"ERROR: Cannot reach {args.board_ip}:{args.port} - {e}")
+        return
     
     # Execute command
     command = args.command.lower()
+    handler = DISPATCH.get(command)
+    response = handler(controller, args.args) if handler else _unknown(command)
     
-    if command == 'info':
-        response = controller.get_info()
-        
-    elif command == 'status':
-        response = controller.get_status()
-        
-    elif command == 'set_mode':
-        if not args.args:
-            response = "ERROR: set_mode requires mode argument (0 or 1)"
-        else:
-            try:
-                mode = int(args.args[0])
-                response = controller.set_mode(mode)
-            except ValueError:
-                response = "ERROR: Mode must be a number (0 or 1)"
-                
-    elif command == 'get_mode':
-        response = controller.get_mode()
-        
-    elif command == 'set_dac_bypass':
-        if not args.args:
-            response = "ERROR: set_dac_bypass requires enable argument (0 or 1)"
-        else:
-            try:
-                enable = int(args.args[0])
-                if enable not in [0, 1]:
-                    response = "ERROR: DAC bypass enable must be 0 or 1"
-                else:
-                    response = controller.set_dac_bypass(enable == 1)
-            except ValueError:
-                response = "ERROR: DAC bypass enable must be a number (0 or 1)"
-                
-    elif command == 'get_dac_bypass':
-        response = controller.get_dac_bypass()
-        
-    elif command == 'set_buffer':
-        if not args.args:
-            response = "ERROR: set_buffer requires size argument"
-        else:
-            try:
-                size = int(args.args[0])
-                response = controller.set_buffer_size(size)
-            except ValueError:
-                response = "ERROR: Buffer size must be a number"
-                
-    elif command == 'set_dest':
-        if len(args.args) < 2:
-            response = "ERROR: set_dest requires IP and port arguments"
-        else:
-            try:
-                dest_ip = args.args[0]
-                dest_port = int(args.args[1])
-                response = controller.set_destination(dest_ip, dest_port)
-            except ValueError:
-                response = "ERROR: Port must be a number"
-                
-    elif command == 'start':
-        response = controller.start_streaming()
-        
-    elif command == 'stop':
-        response = controller.stop_streaming()
-        
-    elif command == 'stats':
-        response = controller.get_stats()
-        
-    elif command == 'reset':
-        response = controller.reset()
-        
-    elif command == 'monitor':
-        duration = 10
-        if args.args:
-            try:
-                duration = int(args.args[0])
-            except ValueError:
-                pass
-        controller.monitor_stats(duration)
-        return
-        
-    elif command == 'test_sequence':
-        print("Running test sequence...")
-        print("1. Getting device info...")
-        print(f"   {controller.get_info()}")
-        
-        print("2. Setting mode to 1...")
-        print(f"   {controller.set_mode(1)}")
-        
-        print("3. Setting buffer size to 4096...")
-        print(f"   {controller.set_buffer_size(4096)}")
-        
-        print("4. Setting destination to 192.168.1.100:12345...")
-        print(f"   {controller.set_destination('192.168.1.100', 12345)}")
-        
-        print("5. Starting streaming...")
-        print(f"   {controller.start_streaming()}")
-        
-        print("6. Monitoring for 10 seconds...")
-        controller.monitor_stats(10, 2)
-        
-        print("7. Stopping streaming...")
-        print(f"   {controller.stop_streaming()}")
-        
-        print("8. Final statistics...")
-        print(f"   {controller.get_stats()}")
-        return
-        
-    else:
-        response = f"ERROR: Unknown command '{command}'"
-        print("\nAvailable commands:")
-        print("  info                    - Get device information")
-        print("  status                  - Get current status")
-        print("  set_mode <0|1>          - Set operation mode")
-        print("  get_mode                - Get current mode")
-        print("  set_buffer <size>       - Set buffer size")
-        print("  set_dest <ip> <port>    - Set destination")
-        print("  start                   - Start streaming")
-        print("  stop                    - Stop streaming")
-        print("  stats                   - Get statistics")
-        print("  reset                   - Reset and stop")
-        print("  monitor [duration]      - Monitor stats")
-        print("  test_sequence           - Run full test")
-    
-    print(response)
+    if response is not None:
+        print(response)
 
 if __name__ == "__main__":
     main()
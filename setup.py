@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+Build the compiled receive loop used by `udp_receiver.py --backend cython`.
+
+Usage:
+    pip install cython
+    python3 setup.py build_ext --inplace
+"""
+
+from setuptools import setup, Extension
+from Cython.Build import cythonize
+
+setup(
+    name='antsdr-udp-receiver',
+    ext_modules=cythonize(
+        [Extension('_udp_recv', ['_udp_recv.pyx'],
+                   define_macros=[('_GNU_SOURCE', None)])],
+        compiler_directives={'language_level': 3}),
+)
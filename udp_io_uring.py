@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+ANTSDR UDP Receiver - io_uring backend
+
+Receives datagrams with a single multishot IORING_OP_RECVMSG armed on the
+socket. The kernel picks a buffer from a provided buffer ring for every
+datagram and posts a completion, so in steady state one io_uring_enter()
+call reaps every packet that arrived since the previous one.
+
+The ring is driven through the raw syscalls via ctypes, so no liburing
+binding is needed. Requires Linux 6.0 or newer on x86-64.
+"""
+
+import ctypes
+import errno
+import mmap
+import os
+import select
+import socket
+import struct
+
+from udp_syscall import check, release_maps, require_x86_64, syscall
+
+# x86-64 syscall numbers
+NR_IO_URING_SETUP = 425
+NR_IO_URING_ENTER = 426
+NR_IO_URING_REGISTER = 427
+
+IORING_SETUP_CQSIZE = 1 << 3
+IORING_SETUP_COOP_TASKRUN = 1 << 8
+IORING_SETUP_SINGLE_ISSUER = 1 << 12
+IORING_SETUP_DEFER_TASKRUN = 1 << 13
+
+IORING_OFF_SQ_RING = 0
+IORING_OFF_CQ_RING = 0x8000000
+IORING_OFF_SQES = 0x10000000
+
+IORING_ENTER_GETEVENTS = 1 << 0
+IORING_ENTER_EXT_ARG = 1 << 3
+
+IORING_OP_POLL_ADD = 6
+IORING_OP_RECVMSG = 10
+IOSQE_BUFFER_SELECT = 1 << 5
+IORING_RECV_MULTISHOT = 1 << 1
+
+IORING_CQE_F_BUFFER = 1 << 0
+IORING_CQE_F_MORE = 1 << 1
+IORING_CQE_BUFFER_SHIFT = 16
+
+IORING_REGISTER_PBUF_RING = 22
+IORING_REGISTER_NAPI = 27
+
+# Buffer group used for the provided receive buffers
+BUFFER_GROUP = 0
+
+# user_data of the poll request watching the wake fd (recvmsg uses 0)
+_WAKE_USER_DATA = 1
+
+class _SQRingOffsets(ctypes.Structure):
+    _fields_ = [('head', ctypes.c_uint32),
+                ('tail', ctypes.c_uint32),
+                ('ring_mask', ctypes.c_uint32),
+                ('ring_entries', ctypes.c_uint32),
+                ('flags', ctypes.c_uint32),
+                ('dropped', ctypes.c_uint32),
+                ('array', ctypes.c_uint32),
+                ('resv1', ctypes.c_uint32),
+                ('user_addr', ctypes.c_uint64)]
+
+class _CQRingOffsets(ctypes.Structure):
+    _fields_ = [('head', ctypes.c_uint32),
+                ('tail', ctypes.c_uint32),
+                ('ring_mask', ctypes.c_uint32),
+                ('ring_entries', ctypes.c_uint32),
+                ('overflow', ctypes.c_uint32),
+                ('cqes', ctypes.c_uint32),
+                ('flags', ctypes.c_uint32),
+                ('resv1', ctypes.c_uint32),
+                ('user_addr', ctypes.c_uint64)]
+
+class _Params(ctypes.Structure):
+    _fields_ = [('sq_entries', ctypes.c_uint32),
+                ('cq_entries', ctypes.c_uint32),
+                ('flags', ctypes.c_uint32),
+                ('sq_thread_cpu', ctypes.c_uint32),
+                ('sq_thread_idle', ctypes.c_uint32),
+                ('features', ctypes.c_uint32),
+                ('wq_fd', ctypes.c_uint32),
+                ('resv', ctypes.c_uint32 * 3),
+                ('sq_off', _SQRingOffsets),
+                ('cq_off', _CQRingOffsets)]
+
+class _SQE(ctypes.Structure):
+    _fields_ = [('opcode', ctypes.c_uint8),
+                ('flags', ctypes.c_uint8),
+                ('ioprio', ctypes.c_uint16),
+                ('fd', ctypes.c_int32),
+                ('off', ctypes.c_uint64),
+                ('addr', ctypes.c_uint64),
+                ('len', ctypes.c_uint32),
+                ('msg_flags', ctypes.c_uint32),
+                ('user_data', ctypes.c_uint64),
+                ('buf_group', ctypes.c_uint16),
+                ('personality', ctypes.c_uint16),
+                ('splice_fd_in', ctypes.c_int32),
+                ('addr3', ctypes.c_uint64),
+                ('pad', ctypes.c_uint64)]
+
+class _CQE(ctypes.Structure):
+    _fields_ = [('user_data', ctypes.c_uint64),
+                ('res', ctypes.c_int32),
+                ('flags', ctypes.c_uint32)]
+
+class _BufReg(ctypes.Structure):
+    _fields_ = [('ring_addr', ctypes.c_uint64),
+                ('ring_entries', ctypes.c_uint32),
+                ('bgid', ctypes.c_uint16),
+                ('flags', ctypes.c_uint16),
+                ('resv', ctypes.c_uint64 * 3)]
+
+class _Buf(ctypes.Structure):
+    _fields_ = [('addr', ctypes.c_uint64),
+                ('len', ctypes.c_uint32),
+                ('bid', ctypes.c_uint16),
+                ('resv', ctypes.c_uint16)]
+
+class _Napi(ctypes.Structure):
+    _fields_ = [('busy_poll_to', ctypes.c_uint32),
+                ('prefer_busy_poll', ctypes.c_uint8),
+                ('pad', ctypes.c_uint8 * 3),
+                ('resv', ctypes.c_uint64)]
+
+class _Timespec(ctypes.Structure):
+    _fields_ = [('tv_sec', ctypes.c_int64),
+                ('tv_nsec', ctypes.c_int64)]
+
+class _GetEventsArg(ctypes.Structure):
+    _fields_ = [('sigmask', ctypes.c_uint64),
+                ('sigmask_sz', ctypes.c_uint32),
+                ('min_wait_usec', ctypes.c_uint32),
+                ('ts', ctypes.c_uint64)]
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [('msg_name', ctypes.c_void_p),
+                ('msg_namelen', ctypes.c_uint32),
+                ('msg_iov', ctypes.c_void_p),
+                ('msg_iovlen', ctypes.c_size_t),
+                ('msg_control', ctypes.c_void_p),
+                ('msg_controllen', ctypes.c_size_t),
+                ('msg_flags', ctypes.c_int)]
+
+# Every provided buffer starts with struct io_uring_recvmsg_out followed by
+# the source sockaddr_in and then the payload
+_RECVMSG_OUT = struct.Struct('=IIII')
+_SOCKADDR_IN = struct.Struct('!2xH4s8x')
+_PAYLOAD_OFFSET = _RECVMSG_OUT.size + _SOCKADDR_IN.size
+
+def _round_pow2(value):
+    return 1 << max(value - 1, 0).bit_length()
+
+class IoUringReceiver:
+    """Multishot recvmsg on `sock` using `buffer_count` kernel-provided buffers.
+
+    When `wake_fd` is given, a poll request on it ends the wait in receive()
+    as soon as it becomes readable.
+    """
+    def __init__(self, sock, buffer_size, buffer_count=64, entries=8, wake_fd=None):
+        require_x86_64("io_uring receive")
+        self.sock = sock
+        self.fd = -1
+        self._maps = []
+        self._to_submit = 0
+
+        # Only the recvmsg and the wake poll are ever submitted, so the SQ
+        # stays small. Every provided buffer can complete before the next
+        # reap, so the CQ gets room for all of them twice over: a full CQ
+        # would end the multishot recvmsg and force a re-arm per burst
+        buffer_count = _round_pow2(buffer_count)
+        cq_entries = 2 * buffer_count
+
+        params = _Params()
+        params.flags = (IORING_SETUP_CQSIZE | IORING_SETUP_SINGLE_ISSUER |
+                        IORING_SETUP_DEFER_TASKRUN | IORING_SETUP_COOP_TASKRUN)
+        params.cq_entries = cq_entries
+        self.fd = syscall(NR_IO_URING_SETUP, entries, ctypes.byref(params))
+        if self.fd < 0 and ctypes.get_errno() == errno.EINVAL:
+            # Kernels before 6.1 reject the task-run flags
+            params = _Params()
+            params.flags = IORING_SETUP_CQSIZE
+            params.cq_entries = cq_entries
+            self.fd = syscall(NR_IO_URING_SETUP, entries, ctypes.byref(params))
+        check(self.fd, "io_uring_setup")
+
+        try:
+            self._map_rings(params)
+            self._setup_buffers(buffer_count, buffer_size)
+        except Exception:
+            self.close()
+            raise
+
+        # Source address lands in the buffer; no control messages wanted
+        self._msghdr = _MsgHdr()
+        self._msghdr.msg_namelen = _SOCKADDR_IN.size
+
+        # Optional bound on the completion wait
+        self._timeout = _Timespec()
+        self._wait_arg = _GetEventsArg()
+
+        self._arm()
+        if wake_fd is not None:
+            self._poll_wake(wake_fd)
+
+    def _mmap(self, length, offset):
+        mm = mmap.mmap(self.fd, length, mmap.MAP_SHARED,
+                       mmap.PROT_READ | mmap.PROT_WRITE, offset=offset)
+        self._maps.append(mm)
+        return mm
+
+    def _map_rings(self, params):
+        sq_off, cq_off = params.sq_off, params.cq_off
+        sq_map = self._mmap(sq_off.array + params.sq_entries * 4, IORING_OFF_SQ_RING)
+        cq_map = self._mmap(cq_off.cqes + params.cq_entries * ctypes.sizeof(_CQE),
+                            IORING_OFF_CQ_RING)
+        sqe_map = self._mmap(params.sq_entries * ctypes.sizeof(_SQE), IORING_OFF_SQES)
+
+        # Ring indices use plain loads/stores (see require_x86_64)
+        self._sq_tail = ctypes.c_uint32.from_buffer(sq_map, sq_off.tail)
+        self._sq_mask = ctypes.c_uint32.from_buffer(sq_map, sq_off.ring_mask).value
+        self._sq_array = (ctypes.c_uint32 * params.sq_entries).from_buffer(sq_map, sq_off.array)
+        self._sqes = (_SQE * params.sq_entries).from_buffer(sqe_map)
+
+        self._cq_head = ctypes.c_uint32.from_buffer(cq_map, cq_off.head)
+        self._cq_tail = ctypes.c_uint32.from_buffer(cq_map, cq_off.tail)
+        self._cq_mask = ctypes.c_uint32.from_buffer(cq_map, cq_off.ring_mask).value
+        self._cqes = (_CQE * params.cq_entries).from_buffer(cq_map, cq_off.cqes)
+
+    def _setup_buffers(self, count, buffer_size):
+        self._slot_size = _PAYLOAD_OFFSET + buffer_size
+        self._pool = bytearray(count * self._slot_size)
+        self._pool_view = memoryview(self._pool)
+        self._pool_addr = ctypes.addressof(
+            (ctypes.c_char * len(self._pool)).from_buffer(self._pool))
+
+        # The buffer ring must be page aligned, which an anonymous map is
+        ring_map = mmap.mmap(-1, count * ctypes.sizeof(_Buf))
+        self._maps.append(ring_map)
+        self._bufs = (_Buf * count).from_buffer(ring_map)
+        self._buf_tail = ctypes.c_uint16.from_buffer(ring_map, 14)
+        self._buf_mask = count - 1
+        self._buf_next = 0
+
+        reg = _BufReg()
+        reg.ring_addr = ctypes.addressof(self._bufs)
+        reg.ring_entries = count
+        reg.bgid = BUFFER_GROUP
+        check(syscall(NR_IO_URING_REGISTER, self.fd, IORING_REGISTER_PBUF_RING,
+                        ctypes.byref(reg), 1), "io_uring_register(PBUF_RING)")
+
+        for bid in range(count):
+            self._provide(bid)
+        self._buf_tail.value = self._buf_next & 0xffff
+
+    def _provide(self, bid):
+        """Queue buffer `bid` for the kernel; published by the caller"""
+        buf = self._bufs[self._buf_next & self._buf_mask]
+        buf.addr = self._pool_addr + bid * self._slot_size
+        buf.len = self._slot_size
+        buf.bid = bid
+        self._buf_next += 1
+
+    def register_napi(self, busy_poll_us):
+        """Busy-poll the socket's NAPI instance while waiting for completions
+        (Linux 6.9+)"""
+        napi = _Napi()
+        napi.busy_poll_to = busy_poll_us
+        napi.prefer_busy_poll = 1
+        check(syscall(NR_IO_URING_REGISTER, self.fd, IORING_REGISTER_NAPI,
+                        ctypes.byref(napi), 1), "io_uring_register(NAPI)")
+
+    def _next_sqe(self):
+        """Claim and clear the next SQE; submitted by the next receive()"""
+        tail = self._sq_tail.value
+        index = tail & self._sq_mask
+        sqe = self._sqes[index]
+        ctypes.memset(ctypes.addressof(sqe), 0, ctypes.sizeof(_SQE))
+        self._sq_array[index] = index
+        self._sq_tail.value = (tail + 1) & 0xffffffff
+        self._to_submit += 1
+        return sqe
+
+    def _poll_wake(self, wake_fd):
+        """Queue a one-shot poll for `wake_fd` becoming readable"""
+        sqe = self._next_sqe()
+        sqe.opcode = IORING_OP_POLL_ADD
+        sqe.fd = wake_fd
+        sqe.msg_flags = select.POLLIN
+        sqe.user_data = _WAKE_USER_DATA
+
+    def _arm(self):
+        """Queue the multishot recvmsg; submitted by the next receive()"""
+        sqe = self._next_sqe()
+        sqe.opcode = IORING_OP_RECVMSG
+        sqe.flags = IOSQE_BUFFER_SELECT
+        sqe.ioprio = IORING_RECV_MULTISHOT
+        sqe.fd = self.sock.fileno()
+        sqe.addr = ctypes.addressof(self._msghdr)
+        sqe.len = 1
+        sqe.buf_group = BUFFER_GROUP
+
+    def receive(self, on_packet, timeout=1.0):
+        """Wait up to `timeout` seconds (None: until a completion arrives),
+        hand every completed datagram to on_packet(data, addr) and return
+        how many were delivered"""
+        if timeout is None:
+            self._wait_arg.ts = 0
+        else:
+            self._timeout.tv_sec = int(timeout)
+            self._timeout.tv_nsec = int((timeout % 1) * 1e9)
+            self._wait_arg.ts = ctypes.addressof(self._timeout)
+        ret = syscall(NR_IO_URING_ENTER, self.fd, self._to_submit, 1,
+                       IORING_ENTER_GETEVENTS | IORING_ENTER_EXT_ARG,
+                       ctypes.byref(self._wait_arg), ctypes.sizeof(self._wait_arg))
+        if ret < 0:
+            err = ctypes.get_errno()
+            if err not in (errno.ETIME, errno.EINTR):
+                raise OSError(err, f"io_uring_enter: {os.strerror(err)}")
+        self._to_submit = 0
+
+        pool = self._pool
+        view = self._pool_view
+        slot_size = self._slot_size
+        head = self._cq_head.value
+        tail = self._cq_tail.value
+        delivered = 0
+        rearm = False
+        error = None
+
+        while head != tail:
+            cqe = self._cqes[head & self._cq_mask]
+            res, flags = cqe.res, cqe.flags
+            head = (head + 1) & 0xffffffff
+
+            # The wake fd fired; the caller checks why
+            if cqe.user_data == _WAKE_USER_DATA:
+                continue
+
+            # The multishot request ends on errors or when buffers run out
+            if not flags & IORING_CQE_F_MORE:
+                rearm = True
+
+            if flags & IORING_CQE_F_BUFFER:
+                bid = flags >> IORING_CQE_BUFFER_SHIFT
+                if res >= 0:
+                    offset = bid * slot_size
+                    _, _, payload_len, _ = _RECVMSG_OUT.unpack_from(pool, offset)
+                    port, ip = _SOCKADDR_IN.unpack_from(pool, offset + _RECVMSG_OUT.size)
+                    start = offset + _PAYLOAD_OFFSET
+                    end = start + min(payload_len, slot_size - _PAYLOAD_OFFSET)
+                    on_packet(view[start:end], (socket.inet_ntoa(ip), port))
+                    delivered += 1
+                self._provide(bid)
+            elif res < 0 and res != -errno.ENOBUFS and error is None:
+                error = OSError(-res, f"recvmsg: {os.strerror(-res)}")
+
+        self._cq_head.value = head
+        self._buf_tail.value = self._buf_next & 0xffff
+        if error is not None:
+            raise error
+        if rearm:
+            self._arm()
+        return delivered
+
+    def close(self):
+        """Tear down the ring; the socket is left open"""
+        release_maps(self, ('_sq_tail', '_sq_array', '_sqes', '_cq_head', '_cq_tail',
+                            '_cqes', '_bufs', '_buf_tail'))
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
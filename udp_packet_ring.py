@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+ANTSDR UDP Receiver - AF_PACKET ring for count-only mode
+
+Counts datagrams for a UDP port through a TPACKET_V3 receive ring. The
+kernel fills whole blocks of packets in a shared mapping and hands them
+over at once, so counting costs one poll() per block instead of a receive
+call per datagram. A socket filter keeps only the matching UDP flow and
+truncates each copy to its headers plus the first few payload bytes, so
+payloads are never copied in full.
+
+Linux only; needs CAP_NET_RAW.
+"""
+
+import ctypes
+import mmap
+import select
+import socket
+import struct
+
+SOL_PACKET = getattr(socket, 'SOL_PACKET', 263)
+PACKET_RX_RING = 5
+PACKET_VERSION = 10
+PACKET_IGNORE_OUTGOING = 23
+TPACKET_V3 = 2
+SO_ATTACH_FILTER = getattr(socket, 'SO_ATTACH_FILTER', 26)
+
+ETH_P_IP = 0x0800
+IPPROTO_UDP = 17
+
+TP_STATUS_KERNEL = 0
+TP_STATUS_USER = 1
+
+# Bytes kept per packet: largest IPv4 header + UDP header + a payload preview
+SNAP_LEN = 128
+
+# struct tpacket_req3
+_REQ3 = struct.Struct('=7I')
+# struct tpacket_block_desc: block_status, num_pkts, offset_to_first_pkt
+_BLOCK_DESC = struct.Struct('=8xIII')
+_BLOCK_STATUS = struct.Struct('=I')
+_BLOCK_STATUS_OFFSET = 8
+# struct tpacket3_hdr: tp_next_offset, tp_snaplen, tp_len, tp_net
+_TP3_HDR = struct.Struct('=I8xII6xH')
+# IPv4 source address and UDP source port / length
+_IP_SRC = struct.Struct('!12x4s')
+_UDP_HDR = struct.Struct('!H2xH')
+
+def bpf_insn(code, jt, jf, k):
+    """Pack one classic BPF instruction (struct sock_filter)"""
+    return struct.pack('=HBBI', code, jt, jf, k)
+
+def attach_filter(sock, program, option=SO_ATTACH_FILTER):
+    """Attach a classic BPF program (list of packed instructions) to sock"""
+    insns = ctypes.create_string_buffer(b''.join(program))
+    fprog = struct.pack('@HP', len(program), ctypes.addressof(insns))
+    sock.setsockopt(socket.SOL_SOCKET, option, fprog)
+
+def udp_port_filter(port, snap_len=SNAP_LEN):
+    """BPF accepting unfragmented IPv4/UDP to `port`, truncated to snap_len"""
+    return [
+        bpf_insn(0x30, 0, 0, 9),            # ldb [9]            IP protocol
+        bpf_insn(0x15, 0, 6, IPPROTO_UDP),  # jeq #17            else drop
+        bpf_insn(0x28, 0, 0, 6),            # ldh [6]            flags/fragment
+        bpf_insn(0x45, 4, 0, 0x1fff),       # jset #0x1fff       drop fragments
+        bpf_insn(0xb1, 0, 0, 0),            # ldxb 4*([0]&0xf)   IP header length
+        bpf_insn(0x48, 0, 0, 2),            # ldh [x+2]          UDP dest port
+        bpf_insn(0x15, 0, 1, port),         # jeq #port          else drop
+        bpf_insn(0x06, 0, 0, snap_len),     # ret #snap_len
+        bpf_insn(0x06, 0, 0, 0),            # ret #0
+    ]
+
+DROP_ALL_FILTER = [bpf_insn(0x06, 0, 0, 0)]
+
+class PacketRing:
+    """TPACKET_V3 ring counting UDP datagrams addressed to `port`"""
+    def __init__(self, port, block_size=1 << 20, block_count=8, block_timeout_ms=10,
+                 wake_fd=None):
+        self.sock = socket.socket(socket.AF_PACKET, socket.SOCK_DGRAM,
+                                  socket.htons(ETH_P_IP))
+        self.ring = None
+        try:
+            attach_filter(self.sock, udp_port_filter(port))
+            try:
+                # Loopback traffic would otherwise be seen twice
+                self.sock.setsockopt(SOL_PACKET, PACKET_IGNORE_OUTGOING, 1)
+            except OSError:
+                pass
+            self.sock.setsockopt(SOL_PACKET, PACKET_VERSION, TPACKET_V3)
+
+            frame_size = 2048
+            req = _REQ3.pack(block_size, block_count, frame_size,
+                             block_size * block_count // frame_size,
+                             block_timeout_ms, 0, 0)
+            self.sock.setsockopt(SOL_PACKET, PACKET_RX_RING, req)
+            self.ring = mmap.mmap(self.sock.fileno(), block_size * block_count,
+                                  mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        except Exception:
+            self.close()
+            raise
+
+        self.block_size = block_size
+        self.block_count = block_count
+        self.current = 0
+        self.poller = select.poll()
+        self.poller.register(self.sock, select.POLLIN | select.POLLERR)
+        if wake_fd is not None:
+            # Readable when the owner wants receive() to return early
+            self.poller.register(wake_fd, select.POLLIN)
+
+    def receive(self, timeout=1.0, on_first_packet=None):
+        """Consume the blocks the kernel has released (at most one full lap
+        of the ring), waiting up to `timeout` seconds (None: until a block
+        arrives or wake_fd is readable) for the first one.
+
+        Returns (packets, payload_bytes). When given, on_first_packet(data,
+        addr, size) is called for the first packet seen, with data truncated
+        to the payload preview kept by the filter.
+        """
+        ring = self.ring
+        packets = 0
+        payload_bytes = 0
+        waited = False
+
+        for _ in range(self.block_count + 1):
+            block = self.current * self.block_size
+            status, num_pkts, offset = _BLOCK_DESC.unpack_from(ring, block)
+            if not status & TP_STATUS_USER:
+                if packets or waited:
+                    break
+                self.poller.poll(None if timeout is None else int(timeout * 1000))
+                waited = True
+                continue
+
+            pkt = block + offset
+            for _ in range(num_pkts):
+                next_offset, snaplen, length, net = _TP3_HDR.unpack_from(ring, pkt)
+                ip = pkt + net
+                ip_header = (ring[ip] & 0x0f) * 4
+                payload_len = length - ip_header - 8
+                payload_bytes += payload_len
+
+                if on_first_packet is not None:
+                    (src_ip,) = _IP_SRC.unpack_from(ring, ip)
+                    src_port, _ = _UDP_HDR.unpack_from(ring, ip + ip_header)
+                    data = ring[ip + ip_header + 8:ip + snaplen]
+                    on_first_packet(data, (socket.inet_ntoa(src_ip), src_port), payload_len)
+                    on_first_packet = None
+                pkt += next_offset
+            packets += num_pkts
+
+            # Hand the block back to the kernel
+            _BLOCK_STATUS.pack_into(ring, block + _BLOCK_STATUS_OFFSET, TP_STATUS_KERNEL)
+            self.current = (self.current + 1) % self.block_count
+
+        return packets, payload_bytes
+
+    def close(self):
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+        self.sock.close()
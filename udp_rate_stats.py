@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+ANTSDR UDP Receiver - rolling throughput statistics
+
+Keeps (time, cumulative bytes) samples in preallocated numpy ring buffers
+and reduces them to the min / average / p99 of the throughput measured over
+a sliding time window. The reduction is compiled with Numba when it is
+installed and runs as plain numpy-indexed Python otherwise.
+
+Needs numpy; Numba is optional.
+"""
+
+import math
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+# Sampling cadence of RateHistory.record (10 Hz)
+SAMPLE_INTERVAL_NS = 100_000_000
+DEFAULT_CAPACITY = 1 << 16
+
+@njit(cache=True, fastmath=True)
+def rolling_mbps(ts_ns, cum_bytes, window_ns):
+    """Throughput over every `window_ns` window ending at a sample.
+
+    ts_ns and cum_bytes are chronological int64 arrays. For each sample the
+    oldest sample at most window_ns earlier is found with a trailing
+    pointer and the rate between the two is taken, in the Mbps units of
+    UDPReceiver. Windows are only counted once a full window of history
+    exists. Returns (min, average, p99), NaN when there is no full window.
+    """
+    n = ts_ns.shape[0]
+    rates = np.empty(n, np.float64)
+    count = 0
+    j = 0
+    for i in range(1, n):
+        while j < i - 1 and ts_ns[i] - ts_ns[j] > window_ns:
+            j += 1
+        if ts_ns[i] - ts_ns[0] < window_ns:
+            continue
+        span = ts_ns[i] - ts_ns[j]
+        if span > 0:
+            rates[count] = (cum_bytes[i] - cum_bytes[j]) * 8.0 / (1024 * 1024) / (span / 1e9)
+            count += 1
+
+    if count == 0:
+        return np.nan, np.nan, np.nan
+    rates = np.sort(rates[:count])
+    # Nearest-rank percentile, so few windows never round down to the minimum
+    p99 = rates[min(count - 1, int(math.ceil(0.99 * count)) - 1)]
+    return rates[0], rates.mean(), p99
+
+class RateHistory:
+    """Ring buffers of (monotonic ns, cumulative bytes) samples"""
+    def __init__(self, capacity=DEFAULT_CAPACITY, interval_ns=SAMPLE_INTERVAL_NS):
+        self.ts_ns = np.zeros(capacity, dtype=np.int64)
+        self.cum_bytes = np.zeros(capacity, dtype=np.int64)
+        self.interval_ns = interval_ns
+        self.count = 0
+        self.next_ns = 0
+
+    def record(self, now_ns, cum_bytes, force=False):
+        """Store a sample unless the previous one is under interval_ns old.
+
+        Callers report whenever they happen to run, which may be far less
+        often than every interval_ns (idle link, low packet rate). The missed
+        slots of the 10 Hz grid are filled with the last known total, so a
+        stall shows up as zero-rate windows instead of being folded into
+        one long span.
+        """
+        if now_ns < self.next_ns and not force:
+            return
+        if self.count:
+            last_ns = self.next_ns - self.interval_ns
+            last_bytes = self.cum_bytes[(self.count - 1) % len(self.ts_ns)]
+            # Older gap samples would be overwritten by the ring anyway
+            gap_start = max(last_ns + self.interval_ns,
+                            now_ns - len(self.ts_ns) * self.interval_ns)
+            for gap_ns in range(gap_start, now_ns, self.interval_ns):
+                self._store(gap_ns, last_bytes)
+        self.next_ns = now_ns + self.interval_ns
+        self._store(now_ns, cum_bytes)
+
+    def _store(self, ts_ns, cum_bytes):
+        slot = self.count % len(self.ts_ns)
+        self.ts_ns[slot] = ts_ns
+        self.cum_bytes[slot] = cum_bytes
+        self.count += 1
+
+    def samples(self):
+        """Stored samples in chronological order"""
+        capacity = len(self.ts_ns)
+        if self.count <= capacity:
+            return self.ts_ns[:self.count], self.cum_bytes[:self.count]
+        head = self.count % capacity
+        return (np.concatenate((self.ts_ns[head:], self.ts_ns[:head])),
+                np.concatenate((self.cum_bytes[head:], self.cum_bytes[:head])))
+
+    def summary(self, window_s):
+        """(min, average, p99) Mbps over `window_s` second windows"""
+        ts_ns, cum_bytes = self.samples()
+        return rolling_mbps(ts_ns, cum_bytes, int(window_s * 1e9))
@@ -12,97 +12,639 @@ import time
 import argparse
 import signal
 import sys
+import selectors
+import errno
+import math
+import binascii
+import ctypes
+import ctypes.util
+import os
+import multiprocessing
+
+# Datagrams pulled from the kernel per recvmmsg(2) call
+DEFAULT_BATCH_SIZE = 64
+
+# Receive loop implementations selectable with --backend
+BACKENDS = ('python', 'cython', 'io_uring')
+
+# Kernel receive queue size; the default (~208 KiB) overflows during DMA bursts
+DEFAULT_RCVBUF = 7 * 1024 * 1024
+
+# Linux-only socket options missing from the socket module on older Pythons
+SO_RCVBUFFORCE = getattr(socket, 'SO_RCVBUFFORCE', 33)
+SO_BUSY_POLL = getattr(socket, 'SO_BUSY_POLL', 46)
+SO_PREFER_BUSY_POLL = getattr(socket, 'SO_PREFER_BUSY_POLL', 69)
+SO_BUSY_POLL_BUDGET = getattr(socket, 'SO_BUSY_POLL_BUDGET', 70)
+SO_ATTACH_REUSEPORT_CBPF = getattr(socket, 'SO_ATTACH_REUSEPORT_CBPF', 51)
+
+# Packets processed per NAPI busy-poll iteration (kernel default is 8)
+BUSY_POLL_BUDGET = 64
+
+# The live statistics line is redrawn at most this often
+STATS_PRINT_INTERVAL_NS = 100_000_000
+_STATS_LINE = (b"Packets: %6d | Bytes: %8d | Rate: %6.1f pkt/s | "
+               b"Throughput: %6.2f Mbps")
+
+class _IOVec(ctypes.Structure):
+    _fields_ = [('iov_base', ctypes.c_void_p),
+                ('iov_len', ctypes.c_size_t)]
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [('msg_name', ctypes.c_void_p),
+                ('msg_namelen', ctypes.c_uint32),
+                ('msg_iov', ctypes.POINTER(_IOVec)),
+                ('msg_iovlen', ctypes.c_size_t),
+                ('msg_control', ctypes.c_void_p),
+                ('msg_controllen', ctypes.c_size_t),
+                ('msg_flags', ctypes.c_int)]
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [('msg_hdr', _MsgHdr),
+                ('msg_len', ctypes.c_uint)]
+
+class _SockAddrIn(ctypes.Structure):
+    _fields_ = [('sin_family', ctypes.c_ushort),
+                ('sin_port', ctypes.c_uint16),
+                ('sin_addr', ctypes.c_uint8 * 4),
+                ('sin_zero', ctypes.c_uint8 * 8)]
+
+def _load_recvmmsg():
+    """Return libc recvmmsg(2), or None where it is not available"""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        func = libc.recvmmsg
+    except (OSError, AttributeError, TypeError):
+        return None
+    func.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint,
+                     ctypes.c_int, ctypes.c_void_p]
+    func.restype = ctypes.c_int
+    return func
+
+_recvmmsg = _load_recvmmsg()
+
+class RecvBatch:
+    """Persistent buffers for receiving up to `count` datagrams per syscall"""
+    def __init__(self, count, buffer_size):
+        if _recvmmsg is None:
+            count = 1
+        self.count = count
+        self.buffers = [bytearray(buffer_size) for _ in range(count)]
+        self.views = [memoryview(buf) for buf in self.buffers]
+        self._fallback_addr = None
+        
+        # recvmmsg(2) descriptors pointing straight at the bytearrays
+        self._iovecs = (_IOVec * count)()
+        self._addrs = (_SockAddrIn * count)()
+        self._msgs = (_MMsgHdr * count)()
+        for i, buf in enumerate(self.buffers):
+            cbuf = (ctypes.c_char * buffer_size).from_buffer(buf)
+            self._iovecs[i].iov_base = ctypes.addressof(cbuf)
+            self._iovecs[i].iov_len = buffer_size
+            hdr = self._msgs[i].msg_hdr
+            hdr.msg_name = ctypes.addressof(self._addrs[i])
+            hdr.msg_namelen = ctypes.sizeof(_SockAddrIn)
+            hdr.msg_iov = ctypes.pointer(self._iovecs[i])
+            hdr.msg_iovlen = 1
+        
+    def receive(self, sock):
+        """Drain up to `count` queued datagrams, returning how many arrived"""
+        if _recvmmsg is None:
+            try:
+                nbytes, self._fallback_addr = sock.recvfrom_into(
+                    self.views[0], 0, getattr(socket, 'MSG_DONTWAIT', 0))
+            except BlockingIOError:
+                return 0
+            self._msgs[0].msg_len = nbytes
+            return 1
+            
+        received = _recvmmsg(sock.fileno(), self._msgs, self.count,
+                             socket.MSG_DONTWAIT, None)
+        if received < 0:
+            err = ctypes.get_errno()
+            if err in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                return 0
+            raise OSError(err, f"recvmmsg: {errno.errorcode.get(err, err)}")
+        return received
+        
+    def total_bytes(self, count):
+        """Sum of the payload lengths of the first `count` slots"""
+        msgs = self._msgs
+        return sum([msgs[i].msg_len for i in range(count)])
+        
+    def packet(self, index):
+        """Return (payload view, (ip, port)) for a received slot"""
+        data = self.views[index][:self._msgs[index].msg_len]
+        if _recvmmsg is None:
+            return data, self._fallback_addr
+        sa = self._addrs[index]
+        return data, (socket.inet_ntoa(bytes(sa.sin_addr)), socket.ntohs(sa.sin_port))
+
+def set_receive_buffer(sock, size):
+    """Request a kernel receive buffer of `size` bytes, return the size granted"""
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, size)
+    granted = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+    
+    # Linux reports double the requested value; less than that means the
+    # request was clamped to net.core.rmem_max
+    if granted < size and sys.platform.startswith('linux'):
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, SO_RCVBUFFORCE, size)
+            granted = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+        except OSError:
+            # SO_RCVBUFFORCE needs CAP_NET_ADMIN
+            pass
+    return granted
+
+def enable_busy_poll(sock, usecs):
+    """Poll the NIC queue for up to `usecs` instead of sleeping on an interrupt.
+    
+    Returns a list of the options the kernel refused. Values above the
+    net.core.busy_read sysctl need CAP_NET_ADMIN, and select()/poll() only
+    busy-polls when net.core.busy_poll is non-zero (set it to at least
+    `usecs`). SO_PREFER_BUSY_POLL and the budget need Linux 5.11+.
+    """
+    refused = []
+    for name, option, value in (('SO_BUSY_POLL', SO_BUSY_POLL, usecs),
+                                ('SO_PREFER_BUSY_POLL', SO_PREFER_BUSY_POLL, 1),
+                                ('SO_BUSY_POLL_BUDGET', SO_BUSY_POLL_BUDGET, BUSY_POLL_BUDGET)):
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, option, value)
+        except OSError:
+            refused.append(name)
+    return refused
+
+def cpu_mask(cpus):
+    """Hex CPU mask in the comma-separated 32-bit groups used by procfs/sysfs"""
+    mask = 0
+    for cpu in cpus:
+        mask |= 1 << cpu
+    groups = []
+    while True:
+        groups.append(f"{mask & 0xffffffff:08x}")
+        mask >>= 32
+        if not mask:
+            break
+    return ','.join(reversed(groups))
+
+def nic_rx_irqs(interface):
+    """Return [(irq, label)] for the receive interrupts of `interface`"""
+    # Multi-queue drivers name IRQs after the interface (eth0-rx-0), virtio
+    # and some others after the underlying device (virtio3-input.0)
+    names = [interface]
+    device = f"/sys/class/net/{interface}/device"
+    if os.path.exists(device):
+        names.append(os.path.basename(os.path.realpath(device)))
+        
+    matches = []
+    try:
+        with open('/proc/interrupts') as f:
+            for line in f:
+                fields = line.split()
+                if not fields or not fields[0].endswith(':') or not fields[0][:-1].isdigit():
+                    continue
+                label = fields[-1]
+                if any(label == n or label.startswith(n + '-') for n in names):
+                    matches.append((int(fields[0][:-1]), label))
+    except OSError:
+        return []
+        
+    rx = [m for m in matches
+          if any(tag in m[1].lower() for tag in ('rx', 'input'))]
+    return rx or matches
+
+def print_affinity_hints(cpus, interface=None):
+    """Print the commands that steer NIC interrupts and RPS to `cpus`"""
+    if interface:
+        interfaces = [interface]
+    else:
+        try:
+            interfaces = sorted(i for i in os.listdir('/sys/class/net')
+                                if os.path.exists(f"/sys/class/net/{i}/device"))
+        except OSError:
+            interfaces = []
+            
+    mask = cpu_mask(cpus)
+    cpu_list = ','.join(str(cpu) for cpu in sorted(cpus))
+    for iface in interfaces:
+        irqs = nic_rx_irqs(iface)
+        if not irqs:
+            continue
+        print(f"To handle {iface} receive interrupts on CPU {cpu_list} (as root):")
+        for irq, label in irqs:
+            print(f"  echo {mask} > /proc/irq/{irq}/smp_affinity    # {label}")
+        print(f"  for q in /sys/class/net/{iface}/queues/rx-*; do echo {mask} > $q/rps_cpus; done")
+    print()
+
+def attach_worker_steering(sock, workers):
+    """Spread datagrams over the SO_REUSEPORT group by payload.
+    
+    The board sends every packet from one address/port, so the kernel's
+    default 4-tuple hash would put them all on one worker. The program runs
+    on the UDP payload and picks socket (sequence_number % workers), using
+    word 1 of the ANTSDR packet header.
+    """
+    from udp_packet_ring import bpf_insn, attach_filter
+    
+    attach_filter(sock, [
+        bpf_insn(0x20, 0, 0, 4),        # ld [4]       sequence_number
+        bpf_insn(0x94, 0, 0, workers),  # mod #workers
+        bpf_insn(0x16, 0, 0, 0),        # ret a
+    ], SO_ATTACH_REUSEPORT_CBPF)
 
 class UDPReceiver:
-    def __init__(self, port=12345, buffer_size=4096):
+    __slots__ = ('port', 'buffer_size', 'batch_size', 'rcvbuf', 'busy_poll_us',
+                 'backend', 'count_only', 'cpu', 'interface',
+                 'workers', 'worker_index', 'shared', '_published',
+                 'sock', 'running', 'batch',
+                 'packets', 'bytes_total', 'start_ns', 'last_ns',
+                 'rate_window', 'rate_history', 'verbose', 'next_print_ns',
+                 'xdp', 'xdp_queue', '_wake_r', '_wake_w')
+    
+    def __init__(self, port=12345, buffer_size=4096, batch_size=DEFAULT_BATCH_SIZE,
+                 rcvbuf=DEFAULT_RCVBUF, backend='python', busy_poll_us=0,
+                 count_only=False, cpu=None, interface=None,
+                 workers=1, worker_index=0, shared=None, rate_window=None,
+                 verbose=False, xdp=False, xdp_queue=0):
         self.port = port
         self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        self.rcvbuf = rcvbuf
+        self.busy_poll_us = busy_poll_us
+        self.backend = backend
+        self.count_only = count_only
+        self.xdp = xdp
+        self.xdp_queue = xdp_queue
+        self.verbose = verbose
+        self.cpu = cpu
+        self.interface = interface
+        
+        # Multi-worker mode: (packets, bytes) multiprocessing.Values that the
+        # workers add to once per stats window instead of printing
+        self.workers = workers
+        self.worker_index = worker_index
+        self.shared = shared
+        self._published = (0, 0)
         self.sock = None
         self.running = True
-        self.stats = {
-            'packets_received': 0,
-            'bytes_received': 0,
-            'start_time': None,
-            'last_packet_time': None
-        }
+        
+        # Socket pair written by stop(); the receive loops block on it together
+        # with the socket instead of waking periodically to check `running`.
+        # A socket pair rather than a pipe so select() also accepts it on Windows
+        self._wake_r = None
+        self._wake_w = None
+        self.batch = RecvBatch(batch_size, buffer_size) if backend == 'python' else None
+        
+        # Statistics; receive loops keep the counters in locals and write
+        # them back at every stats print
+        self.packets = 0
+        self.bytes_total = 0
+        self.start_ns = None
+        self.last_ns = None
+        self.next_print_ns = 0
+        
+        # Optional rolling throughput over rate_window second windows;
+        # needs numpy (and Numba to be fast)
+        self.rate_window = rate_window
+        self.rate_history = None
+        if rate_window:
+            from udp_rate_stats import RateHistory
+            self.rate_history = RateHistory()
         
     def signal_handler(self, signum, frame):
         print(f"\nReceived signal {signum}, stopping...")
-        self.running = False
+        self.stop()
         
+    def stop(self):
+        """Make the receive loop return; safe from signal handlers and other
+        threads"""
+        self.running = False
+        if self._wake_w is not None:
+            try:
+                self._wake_w.send(b"x")
+            except OSError:
+                pass
+                
     def start_receiver(self):
         """Start the UDP receiver"""
         try:
             # Create UDP socket
             self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
             self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if self.shared is not None:
+                self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            
+            # Size the kernel queue before bind so no burst hits the default
+            granted = set_receive_buffer(self.sock, self.rcvbuf)
+            if granted < self.rcvbuf:
+                print(f"Warning: socket receive buffer limited to {granted} bytes "
+                      f"(requested {self.rcvbuf}); raise net.core.rmem_max or run "
+                      f"with CAP_NET_ADMIN")
             
             # Bind to all interfaces
             self.sock.bind(('', self.port))
-            self.sock.settimeout(1.0)  # 1 second timeout
             
-            print(f"UDP receiver listening on port {self.port}")
-            print("Waiting for data from ANTSDR DMA driver...")
-            print("Press Ctrl+C to stop\n")
+            if self.busy_poll_us > 0:
+                refused = enable_busy_poll(self.sock, self.busy_poll_us)
+                if refused:
+                    print(f"Warning: busy polling not fully enabled ({', '.join(refused)} "
+                          f"refused); needs CAP_NET_ADMIN and Linux 5.11+")
             
-            self.stats['start_time'] = time.time()
+            if self.shared is not None and self.worker_index == 0 and self.workers > 1:
+                attach_worker_steering(self.sock, self.workers)
             
-            while self.running:
-                try:
-                    data, addr = self.sock.recvfrom(self.buffer_size)
-                    self.process_packet(data, addr)
-                    
-                except socket.timeout:
-                    # Timeout is normal, just continue
-                    continue
-                except Exception as e:
-                    print(f"Error receiving data: {e}")
-                    break
+            if self.cpu is not None:
+                os.sched_setaffinity(0, {self.cpu})
+                
+            if self.shared is not None:
+                cpu_note = f" on CPU {self.cpu}" if self.cpu is not None else ""
+                print(f"Worker {self.worker_index} listening on port {self.port}{cpu_note}")
+            else:
+                if self.cpu is not None:
+                    print(f"Receiver pinned to CPU {self.cpu}")
+                    print_affinity_hints({self.cpu}, self.interface)
+                print(f"UDP receiver listening on port {self.port}")
+                print("Waiting for data from ANTSDR DMA driver...")
+                print("Press Ctrl+C to stop\n")
+            
+            self._wake_r, self._wake_w = socket.socketpair()
+            self._wake_w.setblocking(False)
+            self.start_ns = time.monotonic_ns()
+            
+            if self.xdp:
+                self.receive_xdp()
+            elif self.count_only and hasattr(socket, 'AF_PACKET'):
+                self.receive_count_only()
+            elif self.backend == 'io_uring':
+                self.receive_io_uring()
+            elif self.backend == 'cython':
+                self.receive_cython()
+            else:
+                self.receive_batched()
                     
         except Exception as e:
             print(f"Failed to start receiver: {e}")
             return 1
             
         finally:
+            if self.shared is not None:
+                self.publish_stats()
             if self.sock:
+                if self.cpu is not None:
+                    self.check_incoming_cpu()
                 self.sock.close()
+            if self._wake_r is not None:
+                wake = (self._wake_r, self._wake_w)
+                self._wake_r = self._wake_w = None
+                for end in wake:
+                    end.close()
                 
         return 0
         
+    def check_incoming_cpu(self):
+        """Warn when the kernel delivered packets on a different CPU"""
+        try:
+            incoming = self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_INCOMING_CPU)
+        except (OSError, AttributeError):
+            return
+        # -1 means the kernel never recorded a CPU for this socket
+        if self.packets and incoming >= 0 and incoming != self.cpu:
+            print(f"\nWarning: packets were processed on CPU {incoming} but the "
+                  f"receiver is pinned to CPU {self.cpu}; see the IRQ hints above")
+            
+    def receive_batched(self):
+        """Receive loop built on recvmmsg(2)"""
+        if self.batch is None:
+            self.batch = RecvBatch(self.batch_size, self.buffer_size)
+        batch = self.batch
+        sock = self.sock
+        receive = batch.receive
+        total_bytes = batch.total_bytes
+        monotonic_ns = time.monotonic_ns
+        packets = self.packets
+        bytes_total = self.bytes_total
+        next_report = (packets // 100 + 1) * 100
+        
+        selector = selectors.DefaultSelector()
+        selector.register(sock, selectors.EVENT_READ)
+        selector.register(self._wake_r, selectors.EVENT_READ)
+        wait = selector.select
+        
+        try:
+            while self.running:
+                try:
+                    # Sleeps until a datagram arrives or stop() is called
+                    wait()
+                    count = receive(sock)
+                    if not count:
+                        continue
+                    if packets == 0:
+                        self.report_first_packet(*batch.packet(0))
+                    packets += count
+                    bytes_total += total_bytes(count)
+                    if self.verbose:
+                        self.dump_packets([batch.packet(i) for i in range(count)])
+                    
+                    # Print statistics every 100 packets
+                    if packets >= next_report:
+                        next_report = (packets // 100 + 1) * 100
+                        self.packets = packets
+                        self.bytes_total = bytes_total
+                        self.last_ns = monotonic_ns()
+                        self.print_stats(self.last_ns)
+                        
+                except Exception as e:
+                    print(f"Error receiving data: {e}")
+                    break
+        finally:
+            selector.close()
+            self.packets = packets
+            self.bytes_total = bytes_total
+                
+    def receive_cython(self):
+        """Receive loop compiled from _udp_recv.pyx"""
+        try:
+            import _udp_recv
+        except ImportError:
+            raise RuntimeError("Cython backend not built; run "
+                               "'python3 setup.py build_ext --inplace'") from None
+            
+        print("Using compiled recvmmsg receive loop")
+        try:
+            _udp_recv.run(self.sock.fileno(), self.buffer_size, self.batch_size, self,
+                          self._wake_r.fileno())
+        except Exception as e:
+            print(f"Error receiving data: {e}")
+            
+    def receive_io_uring(self):
+        """Receive loop built on a multishot io_uring recvmsg"""
+        from udp_io_uring import IoUringReceiver
+        
+        ring = IoUringReceiver(self.sock, self.buffer_size, self.batch_size,
+                               wake_fd=self._wake_r.fileno())
+        print("Using io_uring multishot receive")
+        if self.busy_poll_us > 0:
+            try:
+                ring.register_napi(self.busy_poll_us)
+            except OSError as e:
+                print(f"Warning: io_uring NAPI busy polling unavailable: {e}")
+        try:
+            while self.running:
+                try:
+                    ring.receive(self.process_packet, timeout=None)
+                except Exception as e:
+                    print(f"Error receiving data: {e}")
+                    break
+        finally:
+            ring.close()
+            
+    def receive_count_only(self):
+        """Count datagrams from an AF_PACKET ring without receiving payloads"""
+        from udp_packet_ring import PacketRing, DROP_ALL_FILTER, attach_filter
+        
+        ring = PacketRing(self.port, wake_fd=self._wake_r.fileno())
+        
+        # The UDP socket stays bound so the kernel does not answer the board
+        # with port-unreachable errors, but it discards everything up front
+        attach_filter(self.sock, DROP_ALL_FILTER)
+        print("Using AF_PACKET ring (count-only)")
+        self.receive_counts(ring)
+            
+    def receive_xdp(self):
+        """Count datagrams from an AF_XDP socket on one NIC receive queue"""
+        from udp_packet_ring import DROP_ALL_FILTER, attach_filter
+        from udp_xdp import XskReceiver
+        
+        # Datagrams arriving on other queues still reach the bound socket;
+        # discard them there rather than letting them fill its buffer
+        attach_filter(self.sock, DROP_ALL_FILTER)
+        xsk = XskReceiver(self.interface, self.port, self.xdp_queue,
+                          wake_fd=self._wake_r.fileno())
+        print(f"Using AF_XDP on {self.interface} queue {self.xdp_queue} "
+              f"({xsk.mode} mode, count-only)")
+        print(f"Warning: datagrams on other queues are dropped and not counted. "
+              f"Steer the stream to queue {self.xdp_queue} with:\n"
+              f"  ethtool -N {self.interface} flow-type udp4 dst-port {self.port} "
+              f"action {self.xdp_queue}\n")
+        self.receive_counts(xsk)
+        
+    def receive_counts(self, ring):
+        """Count loop of the count-only backends; `ring` is a PacketRing or
+        XskReceiver and is closed on return"""
+        next_report = 100
+        try:
+            while self.running:
+                try:
+                    first = self.report_first_packet if self.packets == 0 else None
+                    packets, nbytes = ring.receive(None, first)
+                except Exception as e:
+                    print(f"Error receiving data: {e}")
+                    break
+                    
+                if packets:
+                    self.packets += packets
+                    self.bytes_total += nbytes
+                    if self.packets >= next_report:
+                        next_report = (self.packets // 100 + 1) * 100
+                        self.last_ns = time.monotonic_ns()
+                        self.print_stats(self.last_ns)
+        finally:
+            ring.close()
+            
     def process_packet(self, data, addr):
         """Process received packet"""
-        current_time = time.time()
+        packets = self.packets + 1
+        self.packets = packets
+        self.bytes_total += len(data)
         
-        self.stats['packets_received'] += 1
-        self.stats['bytes_received'] += len(data)
-        self.stats['last_packet_time'] = current_time
-        
-        # Print statistics every 100 packets
-        if self.stats['packets_received'] % 100 == 0:
-            self.print_stats()
+        # Print statistics every 100 packets; the clock is only read here
+        # rather than once per packet
+        if packets % 100 == 0:
+            self.last_ns = time.monotonic_ns()
+            self.print_stats(self.last_ns)
             
         # Print first packet details
-        if self.stats['packets_received'] == 1:
-            print(f"First packet received from {addr[0]}:{addr[1]}")
-            print(f"Packet size: {len(data)} bytes")
-            print(f"First 16 bytes: {data[:16].hex()}")
-            print()
+        if packets == 1:
+            self.report_first_packet(data, addr)
+            
+        if self.verbose:
+            self.dump_packets(((data, addr),))
+            
+    def report_first_packet(self, data, addr, size=None):
+        """Print details of the first received packet; `size` overrides
+        len(data) when only a prefix of the payload is available"""
+        print(f"First packet received from {addr[0]}:{addr[1]}")
+        print(f"Packet size: {len(data) if size is None else size} bytes")
+        print(f"First 16 bytes: {memoryview(data)[:16].hex()}")
+        print()
+        
+    def dump_packets(self, packets):
+        """Write an 'ip:port size first-16-bytes' line per (data, addr) pair.
+        
+        Lines are formatted as bytes and go straight to the stdout byte
+        stream, one write per batch, with no text encoding step.
+        """
+        sys.stdout.flush()
+        sys.stdout.buffer.write(b"".join([
+            b"%s:%d %5d %s\n" % (addr[0].encode(), addr[1], len(data),
+                                 binascii.hexlify(memoryview(data)[:16]))
+            for data, addr in packets]))
+        
+    def publish_stats(self):
+        """Add the counts since the last call to the shared worker totals"""
+        packets = self.packets
+        bytes_total = self.bytes_total
+        shared_packets, shared_bytes = self.shared
+        with shared_packets.get_lock():
+            shared_packets.value += packets - self._published[0]
+        with shared_bytes.get_lock():
+            shared_bytes.value += bytes_total - self._published[1]
+        self._published = (packets, bytes_total)
+        
+    def print_stats(self, now_ns=None):
+        """Print current statistics, redrawing the line at most once per
+        STATS_PRINT_INTERVAL_NS"""
+        if self.shared is not None:
+            # Workers report through the shared totals; the parent prints
+            self.publish_stats()
+            return
             
-    def print_stats(self):
-        """Print current statistics"""
-        elapsed = time.time() - self.stats['start_time']
+        if now_ns is None:
+            now_ns = time.monotonic_ns()
+        packets = self.packets
+        bytes_total = self.bytes_total
         
-        packets = self.stats['packets_received']
-        bytes_total = self.stats['bytes_received']
+        if self.rate_history is not None:
+            self.rate_history.record(now_ns, bytes_total)
+            
+        if now_ns < self.next_print_ns:
+            return
+        self.next_print_ns = now_ns + STATS_PRINT_INTERVAL_NS
         
+        elapsed = (now_ns - self.start_ns) / 1e9
         packets_per_sec = packets / elapsed if elapsed > 0 else 0
         bytes_per_sec = bytes_total / elapsed if elapsed > 0 else 0
         mbps = (bytes_per_sec * 8) / (1024 * 1024)
         
-        print(f"\rPackets: {packets:6d} | "
-              f"Bytes: {bytes_total:8d} | "
-              f"Rate: {packets_per_sec:6.1f} pkt/s | "
-              f"Throughput: {mbps:6.2f} Mbps", end='', flush=True)
+        # Carriage return and line go out in one write, bypassing the text
+        # layer; anything already queued there is written first
+        line = _STATS_LINE % (packets, bytes_total, packets_per_sec, mbps)
+        if self.verbose:
+            # Packet dump lines follow, so the stats line cannot be redrawn
+            line += b"\n"
+        sys.stdout.flush()
+        try:
+            # Redirected or wrapped streams (StringIO, IDEs) have no descriptor
+            fd = sys.stdout.fileno() if hasattr(os, 'writev') else None
+        except (AttributeError, ValueError, OSError):
+            fd = None
+        if fd is None:
+            sys.stdout.write("\r" + line.decode())
+            sys.stdout.flush()
+            return
+        written = os.writev(fd, (b"\r", line))
+        # A full pipe or terminal can take only part of it; send the rest
+        while written < len(line) + 1:
+            written += os.write(fd, (b"\r" + line)[written:])
               
     def print_final_stats(self):
         """Print final statistics"""
@@ -110,9 +652,10 @@ class UDPReceiver:
         print("Final Statistics:")
         print("="*60)
         
-        elapsed = time.time() - self.stats['start_time']
-        packets = self.stats['packets_received']
-        bytes_total = self.stats['bytes_received']
+        now_ns = time.monotonic_ns()
+        elapsed = (now_ns - self.start_ns) / 1e9 if self.start_ns else 0.0
+        packets = self.packets
+        bytes_total = self.bytes_total
         
         print(f"Total packets received: {packets}")
         print(f"Total bytes received:   {bytes_total}")
@@ -126,6 +669,78 @@ class UDPReceiver:
             print(f"Average packet rate:    {packets_per_sec:.1f} packets/second")
             print(f"Average throughput:     {mbps:.2f} Mbps")
             print(f"Average packet size:    {bytes_total/packets:.1f} bytes" if packets > 0 else "Average packet size: 0 bytes")
+            
+        if self.rate_history is not None and self.rate_history.count:
+            self.rate_history.record(now_ns, bytes_total, force=True)
+            low, avg, p99 = self.rate_history.summary(self.rate_window)
+            if not math.isnan(avg):
+                print(f"Throughput ({self.rate_window:g}s windows): min {low:.2f} | "
+                      f"avg {avg:.2f} | p99 {p99:.2f} Mbps")
+            else:
+                print(f"Throughput ({self.rate_window:g}s windows): run shorter than one window")
+
+def receiver_from_args(args, **overrides):
+    """Build a UDPReceiver from the parsed command line"""
+    options = dict(port=args.port, buffer_size=args.buffer_size,
+                   batch_size=args.batch_size, rcvbuf=args.rcvbuf,
+                   backend=args.backend, busy_poll_us=args.busy_poll_us,
+                   count_only=args.count_only, cpu=args.cpu,
+                   interface=args.interface, rate_window=args.rate_window,
+                   verbose=args.verbose, xdp=args.xdp, xdp_queue=args.xdp_queue)
+    options.update(overrides)
+    return UDPReceiver(**options)
+
+def run_worker(args, index, cpu, shared):
+    """Entry point of one SO_REUSEPORT worker process"""
+    receiver = receiver_from_args(args, cpu=cpu, workers=args.workers,
+                                  worker_index=index, shared=shared, rate_window=None)
+    signal.signal(signal.SIGINT, lambda signum, frame: receiver.stop())
+    signal.signal(signal.SIGTERM, lambda signum, frame: receiver.stop())
+    sys.exit(receiver.start_receiver())
+
+def run_workers(args):
+    """Receive with args.workers processes sharing the port and print the
+    aggregate statistics"""
+    cpus = sorted(os.sched_getaffinity(0))
+    start = cpus.index(args.cpu) if args.cpu in cpus else 0
+    worker_cpus = [cpus[(start + i) % len(cpus)] for i in range(args.workers)]
+    
+    shared = (multiprocessing.Value('Q', 0), multiprocessing.Value('Q', 0))
+    procs = [multiprocessing.Process(target=run_worker, args=(args, i, cpu, shared))
+             for i, cpu in enumerate(worker_cpus)]
+    
+    # Aggregate view; never opens a socket of its own
+    aggregate = receiver_from_args(args)
+    signal.signal(signal.SIGINT, aggregate.signal_handler)
+    signal.signal(signal.SIGTERM, aggregate.signal_handler)
+    
+    print(f"Starting {args.workers} receive workers on port {args.port}")
+    print_affinity_hints(set(worker_cpus), args.interface)
+    
+    aggregate.start_ns = time.monotonic_ns()
+    for proc in procs:
+        proc.start()
+        
+    def collect():
+        aggregate.packets = shared[0].value
+        aggregate.bytes_total = shared[1].value
+        
+    try:
+        while aggregate.running and any(proc.is_alive() for proc in procs):
+            time.sleep(0.5)
+            collect()
+            if aggregate.packets:
+                aggregate.print_stats()
+    finally:
+        for proc in procs:
+            if proc.is_alive():
+                os.kill(proc.pid, signal.SIGTERM)
+        for proc in procs:
+            proc.join()
+        collect()
+        aggregate.print_final_stats()
+        
+    return max((proc.exitcode or 0) for proc in procs)
 
 def main():
     parser = argparse.ArgumentParser(description='ANTSDR DMA UDP Receiver')
@@ -133,12 +748,67 @@ def main():
                        help='UDP port to listen on (default: 12345)')
     parser.add_argument('-b', '--buffer-size', type=int, default=4096,
                        help='Receive buffer size (default: 4096)')
+    parser.add_argument('-n', '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                       help=f'Datagrams received per syscall (default: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--backend', choices=BACKENDS, default='python',
+                       help='Receive loop: python (recvmmsg via ctypes), cython '
+                            '(compiled, see setup.py) or io_uring (Linux 6.0+, x86-64) '
+                            '(default: python)')
+    parser.add_argument('--count-only', action='store_true',
+                       help='Only count packets, read from an AF_PACKET ring without '
+                            'copying payloads (Linux, needs CAP_NET_RAW); other '
+                            'platforms fall back to recvmmsg')
+    parser.add_argument('--xdp', action='store_true',
+                       help='Count packets from an AF_XDP socket on --interface, '
+                            'bypassing the kernel UDP stack (Linux 5.9+ on x86-64, needs '
+                            'CAP_NET_ADMIN)')
+    parser.add_argument('--xdp-queue', type=int, default=0,
+                       help='NIC RX queue the AF_XDP socket binds to (default: 0)')
+    parser.add_argument('--cpu', type=int, default=None,
+                       help='Pin the receiver to this CPU and print matching NIC IRQ/RPS settings')
+    parser.add_argument('--interface', default=None,
+                       help='NIC for --xdp, and for --cpu IRQ hints (default: all physical interfaces)')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                       help='Receive with N SO_REUSEPORT worker processes, each pinned '
+                            'to its own CPU (default: 1)')
+    parser.add_argument('--busy-poll-us', type=int, default=0,
+                       help='NAPI busy-poll time in microseconds, 0 disables (default: 0); '
+                            'also set sysctl net.core.busy_poll to at least this value')
+    parser.add_argument('--rcvbuf', type=int, default=DEFAULT_RCVBUF,
+                       help=f'Kernel socket receive buffer in bytes (default: {DEFAULT_RCVBUF})')
+    parser.add_argument('--rate-window', type=float, default=None, metavar='SECONDS',
+                       help='Report min/avg/p99 throughput over sliding windows of this '
+                            'length in the final statistics, from totals sampled on a '
+                            '100 ms grid (needs numpy, faster with numba)')
     parser.add_argument('-v', '--verbose', action='store_true',
-                       help='Enable verbose output')
+                       help='Dump source, size and first 16 bytes of every packet '
+                            '(python and io_uring backends)')
     
     args = parser.parse_args()
     
-    receiver = UDPReceiver(port=args.port, buffer_size=args.buffer_size)
+    if args.rate_window:
+        try:
+            import udp_rate_stats
+        except ImportError:
+            parser.error("--rate-window needs numpy (pip install numpy numba)")
+    
+    if args.xdp:
+        if not args.interface:
+            parser.error("--xdp needs --interface")
+        if args.workers > 1 or args.verbose:
+            parser.error("--xdp only counts packets on one queue; it cannot be "
+                         "combined with --workers or -v")
+    
+    if args.verbose and (args.count_only or args.backend == 'cython'):
+        parser.error("-v dumps packets from Python; it cannot be combined with "
+                     "--count-only or --backend cython")
+    
+    if args.workers > 1:
+        if args.count_only:
+            parser.error("--count-only sees every packet and cannot be split across --workers")
+        return run_workers(args)
+        
+    receiver = receiver_from_args(args)
     
     # Setup signal handlers
     signal.signal(signal.SIGINT, receiver.signal_handler)
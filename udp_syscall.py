@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+ANTSDR UDP Receiver - raw syscall helpers
+
+Shared by the io_uring and AF_XDP backends, which talk to the kernel
+through syscall(2) via ctypes and exchange packets over rings mapped into
+this process.
+"""
+
+import ctypes
+import errno
+import os
+import platform
+
+libc = ctypes.CDLL(None, use_errno=True)
+libc.syscall.restype = ctypes.c_long
+
+def syscall(number, *args):
+    """Call syscall `number`, returning -1 with errno set on failure"""
+    # syscall(2) is variadic: widen plain ints to long so no upper bits leak
+    return libc.syscall(ctypes.c_long(number),
+                        *[ctypes.c_long(a) if isinstance(a, int) else a for a in args])
+
+def check(ret, what):
+    """Raise OSError from errno when a libc/syscall return value is negative"""
+    if ret < 0:
+        err = ctypes.get_errno()
+        raise OSError(err, f"{what}: {os.strerror(err)}")
+    return ret
+
+def require_x86_64(what):
+    """Refuse to share rings with the kernel on anything but x86-64.
+
+    Ring heads and tails are read and written with plain ctypes loads and
+    stores, which carry no acquire/release barriers. Only the strong store
+    ordering of x86-64 keeps the kernel from seeing a producer index before
+    the entries it covers.
+    """
+    machine = platform.machine()
+    if machine not in ('x86_64', 'AMD64'):
+        raise OSError(errno.ENOTSUP, f"{what} is only supported on x86-64, "
+                                     f"not {machine}")
+
+def release_maps(owner, views):
+    """Close owner._maps after dropping the ctypes views named in `views`"""
+    # Views into the maps must go before the maps can be closed
+    for name in views:
+        owner.__dict__.pop(name, None)
+    for mm in owner._maps:
+        mm.close()
+    owner._maps = []
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+ANTSDR UDP Receiver - AF_XDP count-only backend
+
+Counts datagrams for a UDP port straight from a NIC receive queue. A small
+XDP program redirects matching unfragmented IPv4/UDP frames (20-byte IP
+header) into an XSKMAP; everything else continues up the normal stack.
+Frames land in a UMEM area shared with this process and are handed back
+to the fill ring as soon as they are counted, so the IP/UDP stack and the
+socket queue are skipped entirely.
+
+The AF_XDP socket serves one RX queue. On multi-queue NICs steer the
+stream to it first, e.g.:
+    ethtool -N eth0 flow-type udp4 dst-port 12345 action 0
+
+The XDP program, map and link are created through the raw bpf(2) syscall
+via ctypes, so neither libbpf nor libxdp is needed. Requires Linux 5.9+
+on x86-64 and CAP_NET_ADMIN (plus CAP_BPF / CAP_NET_RAW, or root).
+"""
+
+import ctypes
+import errno
+import mmap
+import os
+import select
+import socket
+import struct
+
+from udp_syscall import check, libc, release_maps, require_x86_64, syscall
+
+AF_XDP = 44
+SOL_XDP = 283
+
+XDP_MMAP_OFFSETS = 1
+XDP_RX_RING = 2
+XDP_UMEM_REG = 4
+XDP_UMEM_FILL_RING = 5
+XDP_UMEM_COMPLETION_RING = 6
+
+XDP_PGOFF_RX_RING = 0
+XDP_UMEM_PGOFF_FILL_RING = 0x100000000
+
+# bpf(2) x86-64 syscall number, commands, types and flags
+NR_BPF = 321
+BPF_MAP_CREATE = 0
+BPF_MAP_UPDATE_ELEM = 2
+BPF_PROG_LOAD = 5
+BPF_LINK_CREATE = 28
+BPF_MAP_TYPE_XSKMAP = 17
+BPF_PROG_TYPE_XDP = 6
+BPF_XDP = 37
+BPF_PSEUDO_MAP_FD = 1
+BPF_FUNC_redirect_map = 51
+
+XDP_FLAGS_SKB_MODE = 1 << 1
+XDP_FLAGS_DRV_MODE = 1 << 2
+XDP_PASS = 2
+
+# Ethernet + IPv4 (no options) + UDP headers in front of the payload
+_ETH_HLEN = 14
+_UDP_OFFSET = _ETH_HLEN + 20
+_PAYLOAD_OFFSET = _UDP_OFFSET + 8
+
+class _RingOffsets(ctypes.Structure):
+    _fields_ = [('producer', ctypes.c_uint64),
+                ('consumer', ctypes.c_uint64),
+                ('desc', ctypes.c_uint64),
+                ('flags', ctypes.c_uint64)]
+
+class _MmapOffsets(ctypes.Structure):
+    _fields_ = [('rx', _RingOffsets),
+                ('tx', _RingOffsets),
+                ('fr', _RingOffsets),
+                ('cr', _RingOffsets)]
+
+class _UmemReg(ctypes.Structure):
+    _fields_ = [('addr', ctypes.c_uint64),
+                ('len', ctypes.c_uint64),
+                ('chunk_size', ctypes.c_uint32),
+                ('headroom', ctypes.c_uint32),
+                ('flags', ctypes.c_uint32),
+                ('tx_metadata_len', ctypes.c_uint32)]
+
+class _SockaddrXdp(ctypes.Structure):
+    _fields_ = [('family', ctypes.c_uint16),
+                ('flags', ctypes.c_uint16),
+                ('ifindex', ctypes.c_uint32),
+                ('queue_id', ctypes.c_uint32),
+                ('shared_umem_fd', ctypes.c_uint32)]
+
+class _XdpDesc(ctypes.Structure):
+    _fields_ = [('addr', ctypes.c_uint64),
+                ('len', ctypes.c_uint32),
+                ('options', ctypes.c_uint32)]
+
+# Source address / port and UDP length inside a received frame
+_IP_SRC = struct.Struct('!26x4s')
+_UDP_HDR = struct.Struct('!H2xH')
+
+def _bpf(cmd, attr, what):
+    buf = ctypes.create_string_buffer(attr, 144)
+    return check(syscall(NR_BPF, cmd, buf, len(buf)), what)
+
+def _native16(value):
+    """A big-endian 16-bit field as an XDP program's native load sees it"""
+    return struct.unpack('=H', struct.pack('!H', value))[0]
+
+def _insn(code, dst=0, src=0, off=0, imm=0):
+    """Pack one eBPF instruction (struct bpf_insn)"""
+    return struct.pack('=BBhi', code, (src << 4) | dst, off, imm)
+
+def xdp_redirect_program(port, map_fd):
+    """eBPF redirecting IPv4/UDP frames for `port` to the XSK of their RX
+    queue; everything else, and frames on queues without a socket, pass"""
+    pass_label = 23
+
+    def jne_pass(pc, reg, imm):
+        return _insn(0x55, reg, 0, pass_label - pc - 1, imm)
+
+    return [
+        _insn(0xbf, 6, 1),                             # 0  r6 = ctx
+        _insn(0x61, 2, 6, 0),                          # 1  r2 = ctx->data
+        _insn(0x61, 3, 6, 4),                          # 2  r3 = ctx->data_end
+        _insn(0xbf, 4, 2),                             # 3  r4 = r2
+        _insn(0x07, 4, 0, 0, _PAYLOAD_OFFSET),         # 4  r4 += headers
+        _insn(0x2d, 4, 3, pass_label - 6),             # 5  if r4 > r3 pass
+        _insn(0x69, 5, 2, 12),                         # 6  r5 = eth type
+        jne_pass(7, 5, _native16(0x0800)),             # 7
+        _insn(0x71, 5, 2, _ETH_HLEN),                  # 8  r5 = version/IHL
+        jne_pass(9, 5, 0x45),                          # 9
+        _insn(0x71, 5, 2, _ETH_HLEN + 9),              # 10 r5 = protocol
+        jne_pass(11, 5, socket.IPPROTO_UDP),           # 11
+        _insn(0x69, 5, 2, _ETH_HLEN + 6),              # 12 r5 = flags/fragment
+        _insn(0x57, 5, 0, 0, _native16(0x3fff)),       # 13 r5 &= MF | offset
+        jne_pass(14, 5, 0),                            # 14
+        _insn(0x69, 5, 2, _UDP_OFFSET + 2),            # 15 r5 = UDP dest port
+        jne_pass(16, 5, _native16(port)),              # 16
+        _insn(0x61, 2, 6, 16),                         # 17 r2 = ctx->rx_queue_index
+        _insn(0x18, 1, BPF_PSEUDO_MAP_FD, 0, map_fd),  # 18 r1 = xskmap
+        _insn(0x00),                                   # 19
+        _insn(0xb7, 3, 0, 0, XDP_PASS),                # 20 r3 = fallback action
+        _insn(0x85, 0, 0, 0, BPF_FUNC_redirect_map),   # 21 call bpf_redirect_map
+        _insn(0x95),                                   # 22 exit
+        _insn(0xb7, 0, 0, 0, XDP_PASS),                # 23 pass: r0 = XDP_PASS
+        _insn(0x95),                                   # 24 exit
+    ]
+
+class XskReceiver:
+    """AF_XDP socket counting UDP datagrams to `port` on one RX queue"""
+    def __init__(self, interface, port, queue=0, frame_count=2048, frame_size=4096,
+                 wake_fd=None):
+        require_x86_64("AF_XDP receive")
+        self.sock = socket.socket(AF_XDP, socket.SOCK_RAW, 0)
+        self._maps = []
+        self._fds = []
+        self.mode = None
+        try:
+            self._setup_umem(frame_count, frame_size)
+            self._map_rings(frame_count)
+            self._bind(socket.if_nametoindex(interface), queue)
+            self._attach(socket.if_nametoindex(interface), port, queue)
+        except Exception:
+            self.close()
+            raise
+
+        self.poller = select.poll()
+        self.poller.register(self.sock, select.POLLIN | select.POLLERR)
+        if wake_fd is not None:
+            # Readable when the owner wants receive() to return early
+            self.poller.register(wake_fd, select.POLLIN)
+
+    def _setup_umem(self, frame_count, frame_size):
+        # Anonymous maps are page aligned, as the UMEM must be
+        self.umem = mmap.mmap(-1, frame_count * frame_size)
+        self._maps.append(self.umem)
+        self._umem_base = ctypes.c_char.from_buffer(self.umem)
+        self.frame_size = frame_size
+
+        reg = _UmemReg()
+        reg.addr = ctypes.addressof(self._umem_base)
+        reg.len = frame_count * frame_size
+        reg.chunk_size = frame_size
+        self.sock.setsockopt(SOL_XDP, XDP_UMEM_REG, bytes(reg))
+        self.sock.setsockopt(SOL_XDP, XDP_UMEM_FILL_RING, struct.pack('=I', frame_count))
+        # Never used for receive, but the kernel refuses to bind without it
+        self.sock.setsockopt(SOL_XDP, XDP_UMEM_COMPLETION_RING, struct.pack('=I', 64))
+        self.sock.setsockopt(SOL_XDP, XDP_RX_RING, struct.pack('=I', frame_count))
+
+    def _mmap(self, length, offset):
+        mm = mmap.mmap(self.sock.fileno(), length, mmap.MAP_SHARED,
+                       mmap.PROT_READ | mmap.PROT_WRITE, offset=offset)
+        self._maps.append(mm)
+        return mm
+
+    def _map_rings(self, entries):
+        off = _MmapOffsets.from_buffer_copy(
+            self.sock.getsockopt(SOL_XDP, XDP_MMAP_OFFSETS, ctypes.sizeof(_MmapOffsets)))
+        rx_map = self._mmap(off.rx.desc + entries * ctypes.sizeof(_XdpDesc), XDP_PGOFF_RX_RING)
+        fill_map = self._mmap(off.fr.desc + entries * 8, XDP_UMEM_PGOFF_FILL_RING)
+
+        # Ring indices use plain loads/stores (see require_x86_64)
+        self._rx_producer = ctypes.c_uint32.from_buffer(rx_map, off.rx.producer)
+        self._rx_consumer = ctypes.c_uint32.from_buffer(rx_map, off.rx.consumer)
+        self._rx_descs = (_XdpDesc * entries).from_buffer(rx_map, off.rx.desc)
+        self._fill_producer = ctypes.c_uint32.from_buffer(fill_map, off.fr.producer)
+        self._fill_addrs = (ctypes.c_uint64 * entries).from_buffer(fill_map, off.fr.desc)
+        self._mask = entries - 1
+
+        # Hand every frame to the kernel up front
+        for i in range(entries):
+            self._fill_addrs[i] = i * self.frame_size
+        self._fill_producer.value = entries
+
+    def _bind(self, ifindex, queue):
+        addr = _SockaddrXdp(AF_XDP, 0, ifindex, queue, 0)
+        check(libc.bind(self.sock.fileno(), ctypes.byref(addr), ctypes.sizeof(addr)),
+               f"bind(AF_XDP queue {queue})")
+
+    def _attach(self, ifindex, port, queue):
+        map_fd = _bpf(BPF_MAP_CREATE, struct.pack('=5I', BPF_MAP_TYPE_XSKMAP, 4, 4, queue + 1, 0),
+                      "bpf(MAP_CREATE)")
+        self._fds.append(map_fd)
+        key = ctypes.c_uint32(queue)
+        value = ctypes.c_uint32(self.sock.fileno())
+        _bpf(BPF_MAP_UPDATE_ELEM, struct.pack('=I4xQQQ', map_fd, ctypes.addressof(key),
+                                              ctypes.addressof(value), 0),
+             "bpf(MAP_UPDATE_ELEM)")
+
+        program = xdp_redirect_program(port, map_fd)
+        insns = ctypes.create_string_buffer(b''.join(program))
+        license = ctypes.create_string_buffer(b"GPL")
+        log = ctypes.create_string_buffer(1 << 16)
+        prog_fd = _bpf(BPF_PROG_LOAD,
+                       struct.pack('=IIQQIIQII16sII', BPF_PROG_TYPE_XDP, len(program),
+                                   ctypes.addressof(insns), ctypes.addressof(license),
+                                   1, len(log), ctypes.addressof(log), 0, 0,
+                                   b"antsdr_xsk", 0, BPF_XDP),
+                       "bpf(PROG_LOAD)")
+        self._fds.append(prog_fd)
+
+        # Native driver mode where supported, generic (skb) mode otherwise;
+        # the link detaches the program again when its fd is closed
+        for flags, mode in ((XDP_FLAGS_DRV_MODE, 'driver'), (XDP_FLAGS_SKB_MODE, 'generic')):
+            try:
+                link_fd = _bpf(BPF_LINK_CREATE, struct.pack('=4I', prog_fd, ifindex, BPF_XDP, flags),
+                               "bpf(LINK_CREATE)")
+            except OSError as e:
+                if e.errno not in (errno.EOPNOTSUPP, errno.EINVAL) or mode == 'generic':
+                    raise
+                continue
+            self._fds.append(link_fd)
+            self.mode = mode
+            break
+
+    def receive(self, timeout=1.0, on_first_packet=None):
+        """Count the frames waiting in the RX ring, waiting up to `timeout`
+        seconds (None: until a frame arrives or wake_fd is readable) for the
+        first one, and recycle them to the fill ring.
+
+        Returns (packets, payload_bytes). When given, on_first_packet(data,
+        addr, size) is called for the first packet seen.
+        """
+        consumer = self._rx_consumer.value
+        producer = self._rx_producer.value
+        if producer == consumer:
+            self.poller.poll(None if timeout is None else int(timeout * 1000))
+            producer = self._rx_producer.value
+
+        umem = self.umem
+        descs = self._rx_descs
+        fill = self._fill_addrs
+        mask = self._mask
+        chunk_mask = ~(self.frame_size - 1)
+        fill_producer = self._fill_producer.value
+        packets = (producer - consumer) & 0xffffffff
+        payload_bytes = 0
+
+        for i in range(packets):
+            desc = descs[(consumer + i) & mask]
+            addr = desc.addr
+            src_port, udp_len = _UDP_HDR.unpack_from(umem, addr + _UDP_OFFSET)
+            payload_bytes += udp_len - 8
+
+            if on_first_packet is not None:
+                (src_ip,) = _IP_SRC.unpack_from(umem, addr)
+                end = min(addr + desc.len, addr + _UDP_OFFSET + udp_len)
+                on_first_packet(umem[addr + _PAYLOAD_OFFSET:end],
+                                (socket.inet_ntoa(src_ip), src_port), udp_len - 8)
+                on_first_packet = None
+
+            fill[(fill_producer + i) & mask] = addr & chunk_mask
+
+        # Return the frames before releasing the descriptors
+        self._fill_producer.value = (fill_producer + packets) & 0xffffffff
+        self._rx_consumer.value = producer
+        return packets, payload_bytes
+
+    def close(self):
+        """Detach the program and release the socket"""
+        for fd in reversed(self._fds):
+            os.close(fd)
+        self._fds = []
+        release_maps(self, ('_umem_base', '_rx_producer', '_rx_consumer', '_rx_descs',
+                            '_fill_producer', '_fill_addrs'))
+        self.sock.close()